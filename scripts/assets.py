@@ -0,0 +1,49 @@
+# 静的アセット（CSS・JS）の出力
+# CSSは縮小し、どのアセットも内容のハッシュを含むファイル名（style.<hash>.css）で出力する。
+# ファイル名が内容ごとに変わるため、配信側で長期間キャッシュ（immutable）させられる。
+
+import hashlib
+import re
+
+# ハッシュの桁数（ファイル名に入れる長さ）
+FINGERPRINT_LENGTH = 10
+
+# 文字列・コメント・空白・区切り記号・それ以外の並び
+CSS_TOKEN_RE = re.compile(r""""(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|/\*.*?\*/|\s+|[{};,>:]|[^"'/\s{};,>:]+|/""", re.S)
+# 前後の空白を消してよい記号。「:」は `a :hover`（子孫の疑似クラス）があるため後ろの空白だけを消す
+TRIM_AROUND = frozenset("{};,>")
+
+
+def minify_css(text: str) -> str:
+    """コメントと不要な空白、ブロック末尾の「;」を取り除く（文字列の中身はそのまま残す）"""
+    tokens = []
+    for token in CSS_TOKEN_RE.findall(text):
+        if token.startswith("/*") or token.isspace():
+            # コメントは空白として扱い、連続する空白は1つにまとめる
+            if tokens and tokens[-1] != " ":
+                tokens.append(" ")
+            continue
+        if tokens and tokens[-1] == " " and (token in TRIM_AROUND or len(tokens) == 1 or tokens[-2] in TRIM_AROUND or tokens[-2] == ":"):
+            tokens.pop()
+        if token == "}" and tokens and tokens[-1] == ";":
+            tokens.pop()
+        tokens.append(token)
+    if tokens and tokens[-1] == " ":
+        tokens.pop()
+    return "".join(tokens)
+
+
+def fingerprint_name(name: str, data: bytes) -> str:
+    """style.css → style.<内容のハッシュ>.css"""
+    stem, dot, suffix = name.rpartition(".")
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:FINGERPRINT_LENGTH]}{dot}{suffix}"
+
+
+def build_assets(sources: dict) -> dict:
+    """アセット名 → 元の内容 から、アセット名 → (出力ファイル名, 出力する内容) を作る"""
+    assets = {}
+    for name, data in sources.items():
+        if name.endswith(".css"):
+            data = minify_css(data.decode("utf-8")).encode("utf-8")
+        assets[name] = (fingerprint_name(name, data), data)
+    return assets
@@ -0,0 +1,257 @@
+# サイトビルドのベンチマーク
+# generate_articles.py と同じ形のFront Matterを持つ合成記事（日本語の文章・複数言語のコードブロック・表）を
+# 記事数ごとに作り、build() の実時間・最大RSS・フェーズごとの時間・出力バイト数を計測してJSONに保存する。
+# 最大RSSを記事数ごとに測るため、ビルドは記事数ごとに別プロセスで実行する。
+#
+# 使い方: python scripts/bench_build.py [--sizes 100,1000,10000,50000] [--jobs 1] [--output .build_cache/bench_build.json]
+#         コミット間の比較: python scripts/bench_build.py --output after.json --compare before.json
+#         メモリ上限の確認: python scripts/bench_build.py --sizes 50000 --jobs 2 --max-rss-mb 200
+#         （どの記事数でも、メインプロセスとワーカーの最大RSSが上限を超えたら終了コード1で終わる）
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from article_topics import TOPICS
+from build_profile import BuildProfile
+from generate_articles import article_filename, make_front_matter
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPO_DIR = SCRIPT_DIR.parent
+LANGUAGES = ["Python", "JavaScript", "Go", "Java"]
+# テーマはどの言語でも使える形で Python のものを使い回す
+THEMES = [theme.replace("Python", "").strip("の") or theme for theme in TOPICS["Python"]]
+
+SENTENCES = [
+    "{theme}は、{language}でプログラムを書くうえで欠かせない考え方です。",
+    "この記事では、初心者がつまずきやすいポイントを中心に、{theme}の基本を順番に確認していきます。",
+    "まずは小さなサンプルコードを動かし、結果を自分の目で確かめることが上達への近道です。",
+    "実務では、読みやすさと保守しやすさを意識して書くことが求められます。",
+    "エラーが出たときは、メッセージを落ち着いて読み、どの行で何が起きたのかを確認しましょう。",
+    "公式ドキュメントには、ここで紹介しきれない細かな仕様や注意点がまとめられています。",
+    "慣れてきたら、標準ライブラリの実装を読んでみるのもおすすめです。",
+    "同じ処理でも書き方はいくつもあり、チームの規約に合わせて選ぶことが大切です。",
+    "テストを書いておくと、あとから{theme}まわりを変更したときにも安心して作業できます。",
+    "パフォーマンスが問題になるのは、多くの場合データ量が増えてからです。",
+]
+CODE_SAMPLES = {
+    "python": '''def summarize_{name}(items):
+    """{theme}のサンプル"""
+    totals = {{}}
+    for item in items:
+        key = item["category"]
+        totals[key] = totals.get(key, 0) + item["price"] * {n}
+    return sorted(totals.items(), key=lambda pair: -pair[1])
+
+
+print(summarize_{name}([{{"category": "book", "price": {n}}}]))''',
+    "javascript": '''async function fetch{Name}(url) {{
+  const response = await fetch(url, {{ headers: {{ "Accept": "application/json" }} }});
+  if (!response.ok) {{
+    throw new Error(`HTTP ${{response.status}}`);
+  }}
+  const data = await response.json();
+  return data.items.filter((item) => item.score > {n}).map((item) => item.name);
+}}''',
+    "go": '''func Sum{Name}(values []int) (int, error) {{
+	total := 0
+	for i, v := range values {{
+		if v < 0 {{
+			return 0, fmt.Errorf("values[%d] is negative: %d", i, v)
+		}}
+		total += v * {n}
+	}}
+	return total, nil
+}}''',
+    "java": '''public class {Name}Service {{
+    private final Map<String, Integer> counts = new HashMap<>();
+
+    public int increment(String key) {{
+        return counts.merge(key, {n}, Integer::sum);
+    }}
+}}''',
+    "bash": '''for file in logs/{name}-*.log; do
+  grep -c "ERROR" "$file" | awk -v f="$file" '{{ if ($1 > {n}) print f, $1 }}'
+done''',
+    "sql": '''SELECT category, COUNT(*) AS total, AVG(price) AS average
+FROM {name}_orders
+WHERE created_at >= DATE '2025-01-01' AND quantity > {n}
+GROUP BY category
+ORDER BY total DESC;''',
+}
+
+
+def prose(rng: random.Random, language: str, theme: str, sentences: int) -> str:
+    return "".join(rng.choice(SENTENCES).format(language=language, theme=theme) for _ in range(sentences))
+
+
+def code_block(rng: random.Random, index: int, theme: str) -> str:
+    lang = rng.choice(list(CODE_SAMPLES))
+    name = f"item{index}_{rng.randrange(1000)}"
+    code = CODE_SAMPLES[lang].format(name=name, Name=name.title().replace("_", ""), n=rng.randrange(1, 100), theme=theme)
+    return f"```{lang}\n{code}\n```"
+
+
+def table(rng: random.Random, theme: str) -> str:
+    rows = [f"| {theme}の例{i + 1} | {rng.choice(['基本', '応用', '発展'])} | {rng.randrange(1, 60)}分 |" for i in range(rng.randrange(3, 7))]
+    return "| 項目 | 難易度 | 目安時間 |\n| --- | --- | --- |\n" + "\n".join(rows)
+
+
+def synthetic_article(rng: random.Random, language: str, theme: str, index: int, date: str) -> str:
+    """generate_articles.py の出力と同じ形のFront Matterと、見出し・段落・コード・表・リストからなる本文"""
+    # --fill で生成した記事はモデルの応答の description を持ち、スタブのままの記事は持たない
+    description = prose(rng, language, theme, 1) if rng.random() < 0.5 else ""
+    parts = [f"# {language}の{theme}入門", prose(rng, language, theme, 4)]
+    for section in range(rng.randrange(3, 6)):
+        parts.append(f"## {section + 1}. {theme}のポイント{section + 1}")
+        parts.append(prose(rng, language, theme, rng.randrange(2, 6)))
+        if rng.random() < 0.7:
+            parts.append(code_block(rng, index, theme))
+        if rng.random() < 0.3:
+            parts.append(table(rng, theme))
+        if rng.random() < 0.4:
+            parts.append("\n".join(f"- {prose(rng, language, theme, 1)}" for _ in range(rng.randrange(2, 5))))
+    parts.append("## まとめ")
+    parts.append(prose(rng, language, theme, 3))
+    return make_front_matter(language, date, theme, description) + "\n" + "\n\n".join(parts) + "\n"
+
+
+def make_corpus(root: Path, count: int, seed: int = 0):
+    """root/articles/ に count 件の記事を言語ごとに均等に作り、root/templates/ にテンプレートをコピーする"""
+    rng = random.Random(seed)
+    start_date = datetime.date(2025, 1, 1)
+    for i in range(count):
+        language = LANGUAGES[i % len(LANGUAGES)]
+        index = i // len(LANGUAGES) + 1
+        theme = THEMES[index % len(THEMES)]
+        date = (start_date + datetime.timedelta(days=index % 365)).isoformat()
+        path = article_filename(language, theme, index, root / "articles")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(synthetic_article(rng, language, theme, index, date), encoding="utf-8")
+    shutil.copytree(REPO_DIR / "templates", root / "templates")
+
+
+def directory_bytes(root: Path) -> int:
+    return sum(entry.stat().st_size for entry in root.rglob("*") if entry.is_file())
+
+
+def run_build(jobs: int, precompress: bool) -> dict:
+    """カレントディレクトリのサイトを1回ビルドし、計測結果を返す（子プロセスで呼ばれる）"""
+    from build_site import DOCS_DIR, build, precompression_levels
+
+    profile = BuildProfile()
+    start = time.perf_counter()
+    build(jobs=jobs, precompress_levels=precompression_levels() if precompress else None, profile=profile)
+    wall = time.perf_counter() - start
+    return dict(profile.as_dict(), wall_seconds=round(wall, 3), output_bytes=directory_bytes(DOCS_DIR))
+
+
+def child_main(args):
+    """--run-in で指定されたディレクトリで、初回ビルドと変更なしの再ビルドを続けて実行する"""
+    os.chdir(args.run_in)
+    cold = run_build(args.jobs, args.precompress)
+    noop = run_build(args.jobs, args.precompress)
+    # ru_maxrss はLinuxではKB単位。ワーカープロセスの分は RUSAGE_CHILDREN の最大値になる
+    result = {
+        "cold": cold,
+        "noop": noop,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_rss_workers_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+    print(json.dumps(result))
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def print_table(results: list, baseline: dict = None):
+    print(f"{'articles':>8s} {'cold(s)':>8s} {'noop(s)':>8s} {'RSS(MB)':>8s} {'output(MB)':>10s}  主なフェーズ（秒）")
+    for result in results:
+        phases = sorted(result["cold"]["phases"].items(), key=lambda item: -item[1])[:4]
+        line = (f"{result['articles']:8d} {result['cold']['wall_seconds']:8.2f} {result['noop']['wall_seconds']:8.2f} "
+                f"{max(result['peak_rss_mb'], result['peak_rss_workers_mb']):8.1f} {result['cold']['output_bytes'] / 1e6:10.1f}  "
+                + " ".join(f"{name}={seconds:.2f}" for name, seconds in phases))
+        before = (baseline or {}).get(result["articles"])
+        if before is not None:
+            line += f"  （比較対象比 cold {result['cold']['wall_seconds'] / before['cold']['wall_seconds']:.2f}x"
+            line += f" / noop {result['noop']['wall_seconds'] / before['noop']['wall_seconds']:.2f}x）"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成記事でサイトビルドの時間・メモリ・出力サイズを計測します。")
+    parser.add_argument("--sizes", default="100,1000,10000,50000", help="記事数（カンマ区切り）")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="build() の並列プロセス数（0でCPU数）")
+    parser.add_argument("--precompress", action="store_true", help="事前圧縮も含めて計測する")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=Path(".build_cache") / "bench_build.json",
+                        help="結果を保存するJSONファイル（既定はgit管理外の .build_cache/ の下）")
+    parser.add_argument("--compare", type=Path, help="比較対象（以前に保存した結果のJSON）")
+    parser.add_argument("--max-rss-mb", type=float, help="最大RSSの上限(MB)。超えた記事数があれば失敗として終了する")
+    parser.add_argument("--run-in", type=Path, help=argparse.SUPPRESS)  # 子プロセス用
+    args = parser.parse_args()
+    if args.jobs == 0:
+        args.jobs = os.cpu_count() or 1
+    if args.run_in:
+        child_main(args)
+        return
+
+    results = []
+    for size in (int(n) for n in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory(prefix="bench_build_") as tmp:
+            start = time.perf_counter()
+            make_corpus(Path(tmp), size, args.seed)
+            corpus_seconds = time.perf_counter() - start
+            command = [sys.executable, str(Path(__file__).resolve()), "--run-in", tmp, "--jobs", str(args.jobs)]
+            if args.precompress:
+                command.append("--precompress")
+            completed = subprocess.run(command, capture_output=True, text=True, check=True)
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+        result.update(articles=size, corpus_seconds=round(corpus_seconds, 3))
+        results.append(result)
+        print(f"記事 {size} 件: 初回 {result['cold']['wall_seconds']:.2f} 秒 / 再ビルド {result['noop']['wall_seconds']:.2f} 秒", flush=True)
+
+    report = {
+        "revision": git_revision(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "jobs": args.jobs,
+        "precompress": args.precompress,
+        "seed": args.seed,
+        "results": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
+    baseline = None
+    if args.compare:
+        baseline = {result["articles"]: result for result in json.loads(args.compare.read_text(encoding="utf-8"))["results"]}
+    print_table(results, baseline)
+    print(f"結果を {args.output} に保存しました。")
+    if args.max_rss_mb is not None:
+        over = [result for result in results if max(result["peak_rss_mb"], result["peak_rss_workers_mb"]) > args.max_rss_mb]
+        for result in over:
+            print(f"失敗: 記事 {result['articles']} 件で最大RSSが上限 {args.max_rss_mb:.0f} MB を超えました"
+                  f"（メイン {result['peak_rss_mb']} MB / ワーカー {result['peak_rss_workers_mb']} MB）。")
+        if over:
+            sys.exit(1)
+        print(f"最大RSSはすべての記事数で上限 {args.max_rss_mb:.0f} MB 以内でした。")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# 記事本文の一括生成（generate_articles.py --fill）のスループット計測
+# スタブバックエンドまたは偽LLMサーバーを相手に、トピック数と同時実行数を変えて生成にかかる時間を測る
+#
+# 使い方: python scripts/bench_generate.py [--sizes 19,100,1000] [--concurrency 1,8,32] [--latency 0.05] [--backend http]
+#         偽サーバーにレート制限を掛けてスケジューラーを試す場合:
+#         python scripts/bench_generate.py --backend http --throttle-rpm 600 --error-rate 0.05 --rpm 540 --sizes 100 --concurrency 8
+#         長い本文をストリーミングで受け取る場合（最初の書き込みまでの時間と最大RSSを比べる）:
+#         python scripts/bench_generate.py --backend http --body-kb 2048 --chunk-delay 0.001 --sizes 8 --concurrency 8 [--stream]
+
+import argparse
+import asyncio
+import datetime
+import resource
+import tempfile
+from pathlib import Path
+
+from article_topics import TOPICS
+from fake_llm_server import start_fake_server
+from generate_articles import fill_articles
+from llm_backends import HTTPBackend, StubBackend
+from rate_limit import RequestScheduler
+
+
+def synthetic_topics(count: int) -> list:
+    """Pythonのトピックを繰り返して count 件のトピックを作る"""
+    base = TOPICS["Python"]
+    return [base[i % len(base)] + (f" その{i // len(base) + 1}" if i >= len(base) else "") for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="記事本文の一括生成のスループットを計測します。")
+    parser.add_argument("--sizes", default="19,100,1000", help="トピック数（カンマ区切り）")
+    parser.add_argument("--concurrency", default="1,8,32", help="同時実行数（カンマ区切り）")
+    parser.add_argument("--latency", type=float, default=0.05, help="1リクエストあたりの擬似応答時間（秒）")
+    parser.add_argument("--backend", choices=["stub", "http"], default="stub", help="stub: プロセス内スタブ / http: 偽LLMサーバー経由")
+    parser.add_argument("--throttle-rpm", type=int, default=0, help="偽サーバー側のレート制限（http のみ）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="偽サーバーが503を返す確率（http のみ）")
+    parser.add_argument("--stream", action="store_true", help="応答をストリーミングで受け取り、届いた断片から書き込む")
+    parser.add_argument("--body-kb", type=int, default=0, help="偽サーバーが返す本文の大きさ（KB、http のみ）")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="偽サーバーのストリーミングのイベント間の遅延（秒、http のみ）")
+    parser.add_argument("--rpm", type=float, default=None, help="クライアント側のリクエスト数/分の上限")
+    parser.add_argument("--tpm", type=float, default=None, help="クライアント側のトークン数/分の上限")
+    args = parser.parse_args()
+
+    server = None
+    if args.backend == "http":
+        server = start_fake_server(latency=args.latency, throttle_rpm=args.throttle_rpm, error_rate=args.error_rate, seed=0,
+                                   body_kb=args.body_kb, chunk_delay=args.chunk_delay)
+        backend = HTTPBackend(server.url, model="fake")
+    else:
+        backend = StubBackend(latency=args.latency)
+
+    today = datetime.date.today().isoformat()
+    print(f"backend={args.backend} latency={args.latency}s stream={args.stream}")
+    print(f"{'topics':>7s} {'concurrency':>11s} {'elapsed(s)':>10s} {'topics/s':>9s} {'retries':>7s} {'first write(ms)':>15s}")
+    try:
+        for size in (int(n) for n in args.sizes.split(",")):
+            topics = [(i + 1, theme, today) for i, theme in enumerate(synthetic_topics(size))]
+            for concurrency in (int(n) for n in args.concurrency.split(",")):
+                with tempfile.TemporaryDirectory() as tmp:
+                    scheduler = RequestScheduler(args.rpm, args.tpm, backoff_base=0.1)
+                    report = asyncio.run(fill_articles("Python", topics, backend, concurrency, Path(tmp), scheduler=scheduler, stream=args.stream))
+                if report["failed"]:
+                    raise SystemExit(f"{len(report['failed'])} 件失敗しました: {report['failed'][0][1]}")
+                first_write = f"{report['first_write'] * 1000:15.1f}" if report["first_write"] is not None else f"{'-':>15s}"
+                print(f"{size:7d} {concurrency:11d} {report['elapsed']:10.2f} {size / report['elapsed']:9.1f} {report['retries']:7d} {first_write}")
+        # ru_maxrss はLinuxではKB単位
+        print(f"最大RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
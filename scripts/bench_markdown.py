@@ -0,0 +1,63 @@
+# Markdown変換のマイクロベンチマーク
+# articles/python の記事を複製して合成コーパスを作り、記事ごとにMarkdownインスタンスを
+# 作り直す場合（従来の markdown.markdown() 相当）と、1つのインスタンスを reset() して
+# 使い回す場合の1記事あたりのコストを比較する
+#
+# 使い方: python scripts/bench_markdown.py [--count 10000]
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from build_site import ARTICLES_DIR, create_environment, create_markdown, process_markdown_file
+
+
+def make_corpus(dest: Path, count: int) -> list:
+    """articles/python の記事を count 件になるまで複製する（本文末尾に連番を付けて内容を変える）"""
+    sources = sorted((ARTICLES_DIR / "python").glob("*.md"))
+    if not sources:
+        raise SystemExit(f"{ARTICLES_DIR / 'python'} に記事がありません。")
+    texts = [path.read_text(encoding="utf-8") for path in sources]
+    paths = []
+    for i in range(count):
+        path = dest / f"{i:05d}_{sources[i % len(sources)].stem}.md"
+        path.write_text(texts[i % len(texts)] + f"\n\n合成記事 {i}\n", encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def run(paths: list, reuse: bool) -> float:
+    env = create_environment()
+    base_template = env.get_template("base.html")
+    md = create_markdown() if reuse else None
+    start = time.perf_counter()
+    for path in paths:
+        process_markdown_file(path, env, base_template, "python", md)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Markdownインスタンス再利用の効果を計測します。")
+    parser.add_argument("--count", type=int, default=10000, help="合成する記事数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_corpus(Path(tmp), args.count)
+        # ファイルキャッシュを温めるため一度読んでおく
+        for path in paths:
+            path.read_bytes()
+        results = {
+            "per-file Markdown() (before)": run(paths, reuse=False),
+            "reused Markdown.reset() (after)": run(paths, reuse=True),
+        }
+
+    print(f"記事数: {args.count}")
+    for label, elapsed in results.items():
+        print(f"  {label:32s} 合計 {elapsed:8.2f} s / 1記事 {elapsed / args.count * 1000:7.3f} ms")
+    before, after = results.values()
+    print(f"  速度向上: {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# 事前圧縮のベンチマークとサイズレポート
+# docs/ の HTML/CSS/JS/JSON を圧縮レベルごとに（ファイルは書き出さずメモリ上で）圧縮し、
+# 所要時間と圧縮後の合計サイズを比べる。最後に既定のレベルでのファイル種類別のサイズを表示する。
+#
+# 使い方: python scripts/bench_precompress.py [--docs docs] [--jobs 0] [--gzip-levels 1,6,9] [--zstd-levels 3,19]
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from precompress import COMPRESSIBLE_SUFFIXES, DEFAULT_LEVELS, MIN_SIZE, available_encodings, compress
+
+
+def load_outputs(docs: Path) -> dict:
+    """圧縮対象のファイル → 内容"""
+    outputs = {}
+    for path in sorted(docs.rglob("*")):
+        if path.suffix in COMPRESSIBLE_SUFFIXES and not path.name.startswith(".") and path.stat().st_size >= MIN_SIZE:
+            outputs[path] = path.read_bytes()
+    return outputs
+
+
+def compress_all(outputs: dict, encoding: str, level: int, jobs: int) -> tuple:
+    """(経過秒数, ファイル → 圧縮後のサイズ)"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        sizes = list(executor.map(lambda data: len(compress(data, encoding, level)), outputs.values()))
+    return time.perf_counter() - start, dict(zip(outputs, sizes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="圧縮レベルごとの圧縮時間と圧縮後のサイズを計測します。")
+    parser.add_argument("--docs", type=Path, default=Path("docs"))
+    parser.add_argument("--jobs", "-j", type=int, default=0, help="圧縮の並列スレッド数（0でCPU数）")
+    parser.add_argument("--gzip-levels", default="1,3,6,9")
+    parser.add_argument("--zstd-levels", default="1,3,9,19")
+    args = parser.parse_args()
+    jobs = args.jobs or os.cpu_count() or 1
+
+    outputs = load_outputs(args.docs)
+    original = sum(map(len, outputs.values()))
+    print(f"{len(outputs)} ファイル、合計 {original / 1024:.1f} KB（並列 {jobs}）")
+    levels = {"gzip": args.gzip_levels, "zstd": args.zstd_levels}
+    default_sizes = {}
+    print(f"{'encoding':8s} {'level':>5s} {'time(ms)':>9s} {'MB/s':>7s} {'size(KB)':>10s} {'ratio':>7s}")
+    for encoding in available_encodings():
+        for level in (int(n) for n in levels[encoding].split(",")):
+            seconds, sizes = compress_all(outputs, encoding, level, jobs)
+            total = sum(sizes.values())
+            print(f"{encoding:8s} {level:5d} {seconds * 1000:9.0f} {original / seconds / 1e6:7.1f} "
+                  f"{total / 1024:10.1f} {total / original:7.1%}")
+            if level == DEFAULT_LEVELS[encoding]:
+                default_sizes[encoding] = sizes
+    if "zstd" not in available_encodings():
+        print("（zstandard がインストールされていないため zstd は計測していません）")
+
+    # 既定の圧縮レベルでの、ファイル種類別のサイズ
+    print(f"\n{'type':6s} {'files':>6s} {'original(KB)':>13s} " + " ".join(f"{encoding + '(KB)':>11s}" for encoding in default_sizes))
+    for suffix in COMPRESSIBLE_SUFFIXES:
+        paths = [path for path in outputs if path.suffix == suffix]
+        if not paths:
+            continue
+        row = f"{suffix:6s} {len(paths):6d} {sum(len(outputs[path]) for path in paths) / 1024:13.1f} "
+        row += " ".join(f"{sum(sizes[path] for path in paths) / 1024:11.1f}" for sizes in default_sizes.values())
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
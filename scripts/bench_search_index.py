@@ -0,0 +1,68 @@
+# 検索インデックス生成のベンチマーク
+# article_topics.py のテーマを組み合わせた合成メタデータで、記事数ごとの生成時間・インデックスの大きさと、
+# 1回の検索でブラウザが取得するデータ量（meta.json・必要なシャード・記事情報）を測る
+# （max shard は単独ファイルにした語も含めた最大のファイル）
+#
+# 使い方: python scripts/bench_search_index.py [--sizes 1000,10000,50000]
+
+import argparse
+import datetime
+import random
+import time
+
+from article_topics import TOPICS
+from build_manifest import ArticleMeta
+from search_index import DOCS_PER_CHUNK, build_search_index, encode, query_terms, search, term_file
+
+QUERIES = ["データ型", "クラス", "例外処理", "非同期", "python", "テスト", "型"]
+
+
+def synthetic_metas(count: int, seed: int = 0) -> list:
+    """全言語のテーマを組み合わせて、タイトル・説明・タグがばらつく記事メタデータを作る"""
+    rng = random.Random(seed)
+    themes = [(language, theme) for language, topics in TOPICS.items() for theme in topics]
+    metas = []
+    for i in range(count):
+        language, theme = themes[i % len(themes)]
+        other = rng.choice(themes)[1]
+        metas.append(ArticleMeta(
+            title=f"{language}の{theme}入門 その{i // len(themes) + 1}",
+            description=f"{language}の{theme}について、{other}との関係も含めて初心者向けに解説します。",
+            date=datetime.date(2025, 1, 1) + datetime.timedelta(days=i % 365),
+            categories=(),
+            tags=("AI", "自動生成", language, theme),
+            slug=f"{i:05d}",
+            language_slug=language.lower(),
+        ))
+    return metas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="検索インデックス生成の時間と大きさを計測します。")
+    parser.add_argument("--sizes", default="1000,10000,50000", help="記事数（カンマ区切り）")
+    args = parser.parse_args()
+
+    print(f"{'articles':>8s} {'build(s)':>9s} {'terms':>7s} {'shards':>6s} {'total(KB)':>10s} {'max shard(KB)':>13s} {'fetch/query(KB)':>15s}")
+    for size in (int(n) for n in args.sizes.split(",")):
+        metas = synthetic_metas(size)
+        start = time.perf_counter()
+        files = build_search_index(metas)
+        encoded = {name: encode(value) for name, value in files.items()}
+        elapsed = time.perf_counter() - start
+        shards = [data for name, data in encoded.items() if name.startswith(("terms-", "large-"))]
+        # 1回の検索で取得するファイル（ローダーと同じ選び方）の合計
+        fetched = []
+        for query in QUERIES:
+            names = {"meta.json"}
+            names.update(term_file(files["meta.json"], term) for term in query_terms(query))
+            urls = {doc[0] for doc in search(files, query)}
+            names.update(f"docs-{i // DOCS_PER_CHUNK}.json" for i, meta in enumerate(metas)
+                         if f"/{meta.language_slug}/{meta.slug}.html" in urls)
+            fetched.append(sum(len(encoded[name]) for name in names))
+        print(f"{size:8d} {elapsed:9.2f} {files['meta.json']['terms']:7d} {len(shards):6d} "
+              f"{sum(map(len, encoded.values())) / 1024:10.1f} {max(map(len, shards)) / 1024:13.1f} "
+              f"{sum(fetched) / len(fetched) / 1024:15.1f}")
+
+
+if __name__ == "__main__":
+    main()
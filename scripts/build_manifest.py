@@ -0,0 +1,177 @@
+# ビルドマニフェスト
+# 記事ソース・テンプレートのハッシュと出力パスを記録し、差分ビルドに利用する。
+# 記事数が多くても読み書きでメモリが膨らまないよう、1行目に全体の情報、2行目以降に1記事1行を書く
+# JSON Lines 形式で保存し、1行ずつ読み込む。
+
+import datetime
+import hashlib
+import json
+from pathlib import Path
+from typing import NamedTuple
+
+MANIFEST_VERSION = 4
+
+
+class ArticleMeta(NamedTuple):
+    """一覧ページ・検索インデックス・フィード・サイトマップに使う記事のメタデータ
+
+    全記事分をメモリに持つため、これらが使う項目だけを持つタプルにする（Front Matterのほかの項目は持たない）。
+    """
+    title: str
+    description: str
+    date: datetime.date  # Front Matterの日付（なければ None）
+    categories: tuple
+    tags: tuple
+    slug: str
+    language_slug: str
+
+
+class ManifestEntry(NamedTuple):
+    source_hash: str
+    templates: dict  # 依存テンプレート → ハッシュ（記事間で共有する。書き換えないこと）
+    output: str
+    meta: ArticleMeta
+    modified: str  # ソースの内容が最後に変わった日（YYYY-MM-DD）。初めて見た記事では None
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hash_bytes(f.read())
+
+
+class BuildManifest:
+    """ソースパス → (ソースのハッシュ, 依存テンプレートのハッシュ, 出力パス, メタデータ, ソースが最後に変わった日) の対応表"""
+
+    def __init__(self, path: Path, settings: str = ""):
+        self.path = path
+        self.settings = settings  # Markdown拡張の設定など、全記事に影響するビルド設定のハッシュ
+        self.entries = {}
+        self.index_outputs = []  # 一覧ページ（言語別・メイン・タグ別）の出力パス
+        self.asset_outputs = []  # ハッシュ付きのファイル名で出力したCSS・JS
+        self.index_pages = {}  # 一覧ページの出力パス → 描画したときの入力のハッシュ（build_site.PageCache）
+        self.precompress = {}  # 事前圧縮のエンコーディング → 圧縮レベル（空なら圧縮ファイルを置いていない）
+        self.incompressible = {}  # 圧縮しても縮まない出力のパス → 内容のハッシュ（precompress を参照）
+        self.sitemap_outputs = []  # sitemap.xml・分割したサイトマップ・robots.txt の出力パス
+        self.sitemap_hashes = {}  # 分割したサイトマップ（.xml.gz）の docs/ からの相対パス → 圧縮前の内容のハッシュ
+        self._shared = {}  # 記事間で共有する値（_compact を参照）
+
+    @classmethod
+    def load(cls, path: Path):
+        """マニフェストを読み込む。存在しない・壊れている・形式が古い場合は None を返す"""
+        if not path.exists():
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.loads(f.readline())
+                if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+                    return None
+                manifest = cls(path, data.get("settings", ""))
+                for line in f:
+                    manifest._load_entry(json.loads(line))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        manifest.index_outputs = data.get("index_outputs", [])
+        manifest.asset_outputs = data.get("asset_outputs", [])
+        manifest.index_pages = data.get("index_pages", {})
+        manifest.precompress = data.get("precompress", {})
+        manifest.incompressible = data.get("incompressible", {})
+        manifest.sitemap_outputs = data.get("sitemap_outputs", [])
+        manifest.sitemap_hashes = data.get("sitemap_hashes", {})
+        return manifest
+
+    def is_fresh(self, source: str, source_hash: str, templates: dict, output_path: Path, settings: str) -> bool:
+        """前回ビルド時から入力が変わっておらず、出力もディスク上に残っているか"""
+        entry = self.entries.get(source)
+        return (
+            entry is not None
+            and self.settings == settings
+            and entry.source_hash == source_hash
+            and entry.templates == templates
+            and entry.output == output_path.as_posix()
+            and output_path.exists()
+        )
+
+    def _share(self, key, value):
+        return self._shared.setdefault(key, value)
+
+    def _store(self, source: str, source_hash: str, templates: dict, output: str, meta: ArticleMeta, modified: str):
+        self.entries[source] = ManifestEntry(source_hash, self._share(("templates", *sorted(templates.items())), templates),
+                                             output, meta, self._share(("modified", modified), modified))
+
+    def _compact(self, title, description, date, categories, tags, slug, language_slug) -> ArticleMeta:
+        """タグ・カテゴリ・日付・言語が同じ記事どうしで、同じオブジェクトを共有させたメタデータを作る
+
+        マニフェストは全記事分をメモリに持つため、記事数が多いときに重複した値の分だけメモリが増えないようにする。
+        依存テンプレートのハッシュと更新日も _store で同じように共有する。
+        """
+        share = self._share
+        return ArticleMeta(title, description, share(("date", date), date),
+                           share(("categories", *categories), tuple(categories)), share(("tags", *tags), tuple(tags)),
+                           slug, share(("language_slug", language_slug), language_slug))
+
+    def _load_entry(self, data: dict):
+        meta = data["meta"]
+        date = datetime.date.fromisoformat(meta["date"]) if meta["date"] else None
+        self._store(data["source"], data["source_hash"], data["templates"], data["output"],
+                    self._compact(meta["title"], meta["description"], date, meta["categories"], meta["tags"],
+                                  meta["slug"], meta["language_slug"]),
+                    data["modified"])
+
+    def get_meta(self, source: str) -> ArticleMeta:
+        return self.entries[source].meta
+
+    def get_modified(self, source: str) -> str:
+        """ソースの内容が最後に変わった日（YYYY-MM-DD）。記録がなければ None"""
+        entry = self.entries.get(source)
+        return entry.modified if entry is not None else None
+
+    def record(self, source: str, source_hash: str, templates: dict, output_path: Path, meta: ArticleMeta):
+        previous = self.entries.get(source)
+        if previous is not None and previous.source_hash == source_hash:
+            modified = previous.modified  # テンプレートの変更などで描画し直しただけなら変わらない
+        elif previous is not None or not meta.date:
+            modified = datetime.date.today().isoformat()
+        else:
+            modified = None  # 初めて見る記事はFront Matterの日付を更新日とみなす（初回ビルドで全記事が今日にならないように）
+        self._store(source, source_hash, templates, output_path.as_posix(), self._compact(*meta), modified)
+
+    def remove(self, source: str) -> Path:
+        """記事をマニフェストから除き、その出力パスを返す"""
+        return Path(self.entries.pop(source).output)
+
+    def remove_stale(self, seen_sources) -> list:
+        """今回のビルドで見つからなかったソースをマニフェストから除き、その出力パスを返す"""
+        return [self.remove(source) for source in sorted(set(self.entries) - set(seen_sources))]
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        header = {
+            "version": MANIFEST_VERSION,
+            "settings": self.settings,
+            "index_outputs": self.index_outputs,
+            "asset_outputs": self.asset_outputs,
+            "index_pages": self.index_pages,
+            "precompress": self.precompress,
+            "incompressible": self.incompressible,
+            "sitemap_outputs": self.sitemap_outputs,
+            "sitemap_hashes": self.sitemap_hashes,
+        }
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(header, ensure_ascii=False, sort_keys=True) + "\n")
+            for source in sorted(self.entries):
+                entry = self.entries[source]
+                line = {
+                    "source": source,
+                    "source_hash": entry.source_hash,
+                    "templates": entry.templates,
+                    "output": entry.output,
+                    "meta": dict(entry.meta._asdict(), date=entry.meta.date.isoformat() if entry.meta.date else None),
+                    "modified": entry.modified,
+                }
+                f.write(json.dumps(line, ensure_ascii=False, sort_keys=True) + "\n")
+        tmp_path.replace(self.path)
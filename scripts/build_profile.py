@@ -0,0 +1,121 @@
+# ビルドの所要時間の内訳（フェーズごとの計測）
+# 記事1件の処理を 読み込み → Front Matter → Markdown → ハイライト → テンプレート → 書き込み に分けて計る。
+# 入れ子になったフェーズ（Markdown変換中のハイライトなど）の時間は外側のフェーズから差し引くため、
+# 各フェーズの合計は全体の所要時間と一致する。
+
+import json
+import os
+import time
+from contextlib import contextmanager
+
+# 記事ごとに計測するフェーズ
+ARTICLE_PHASES = ("read", "front_matter", "markdown", "highlight", "template", "write")
+# ビルド全体で1回ずつ行うフェーズ
+BUILD_PHASES = ("scan", "index_pages", "search_index", "sitemap", "precompress")
+
+
+class PhaseTimer:
+    """フェーズ名 → 経過秒数（入れ子の内側の時間を除く）"""
+
+    def __init__(self):
+        self.seconds = {}
+        self.events = None  # トレースを取るときだけ [(名前, 開始時刻, 経過秒数, プロセスID, 記事)] にする
+        self._children = []  # 計測中のフェーズごとの、内側のフェーズの経過秒数
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        self._children.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._children.pop()
+            self.seconds[name] = self.seconds.get(name, 0.0) + elapsed - children
+            if self._children:
+                self._children[-1] += elapsed
+            if self.events is not None:
+                self.events.append((name, start, elapsed, os.getpid(), None))
+
+    def record(self, name: str, start: float, elapsed: float, label: str = None):
+        """トレースにだけ残す区間（記事1件の処理全体など）"""
+        if self.events is not None:
+            self.events.append((name, start, elapsed, os.getpid(), label))
+
+    def take(self, names=ARTICLE_PHASES) -> tuple:
+        """names の順に経過秒数を取り出し、取り出したフェーズを0に戻す"""
+        return tuple(self.seconds.pop(name, 0.0) for name in names)
+
+    def take_events(self):
+        """記録したトレースのイベントを取り出す（トレースを取っていなければ None）"""
+        if self.events is None:
+            return None
+        events, self.events = self.events, []
+        return events
+
+
+# このプロセスの計測器。ハイライトのようにMarkdown拡張の奥で行う処理もここに記録する
+timer = PhaseTimer()
+
+
+class BuildProfile:
+    """ビルド1回分のフェーズごとの合計秒数と、記事ごとの内訳
+
+    並列ビルドでは記事ごとのフェーズはワーカーでの経過時間の合計になるため、全体の実時間より大きくなりうる。
+    trace=True なら、Chrome のトレースビューアー（chrome://tracing・Perfetto）で開けるイベントも集める。
+    """
+
+    def __init__(self, trace: bool = False):
+        self.phases = dict.fromkeys(ARTICLE_PHASES + BUILD_PHASES, 0.0)
+        self.articles = 0
+        self.bytes_written = 0
+        self.records = []  # (記事, ARTICLE_PHASES の順の経過秒数)
+        self.trace = trace
+        self.events = []
+        self.wall_seconds = 0.0
+
+    def add_article(self, times: tuple, source: str = None, events: list = None):
+        """ARTICLE_PHASES の順の経過秒数を、記事1件分として加える"""
+        self.articles += 1
+        for name, seconds in zip(ARTICLE_PHASES, times):
+            self.phases[name] += seconds
+        self.records.append((source, times))
+        if events:
+            self.events.extend(events)
+
+    def add_phases(self, seconds: dict):
+        for name, value in seconds.items():
+            self.phases[name] = self.phases.get(name, 0.0) + value
+
+    def report(self, top: int = 10) -> str:
+        """フェーズごとの合計と、時間のかかった記事の上位 top 件の表"""
+        total = sum(self.phases.values())
+        lines = [f"フェーズ別の所要時間（記事 {self.articles} 件、実時間 {self.wall_seconds:.2f} 秒）:"]
+        for name, seconds in sorted(self.phases.items(), key=lambda item: -item[1]):
+            if seconds:
+                lines.append(f"  {name:14s} {seconds:9.3f} s {seconds / total if total else 0:7.1%}")
+        slowest = sorted(self.records, key=lambda record: -sum(record[1]))[:top]
+        if slowest:
+            lines.append(f"\n時間のかかった記事（上位 {len(slowest)} 件、ms）:")
+            lines.append(f"  {'合計':>8s} " + " ".join(f"{name[:10]:>10s}" for name in ARTICLE_PHASES) + "  記事")
+            for source, times in slowest:
+                lines.append(f"  {sum(times) * 1000:8.1f} " + " ".join(f"{seconds * 1000:10.1f}" for seconds in times) + f"  {source}")
+        return "\n".join(lines)
+
+    def write_trace(self, path):
+        """Chrome trace event形式のJSONを書き出す（時刻はビルド中で最初のイベントを0とするマイクロ秒）"""
+        origin = min((event[1] for event in self.events), default=0.0)
+        trace_events = []
+        for name, start, elapsed, pid, label in self.events:
+            event = {"name": name if label is None else label, "cat": name, "ph": "X", "pid": pid, "tid": pid,
+                     "ts": round((start - origin) * 1e6, 1), "dur": round(elapsed * 1e6, 1)}
+            trace_events.append(event)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+    def as_dict(self) -> dict:
+        return {
+            "articles": self.articles,
+            "bytes_written": self.bytes_written,
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+        }
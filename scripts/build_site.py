@@ -2,120 +2,678 @@
 # articles/ のMarkdownを docs/ にHTML変換し、Qiita/GitHub/Zenn風デザイン・SEO・広告枠を反映
 
 import os
+import argparse
+import cProfile
+import json
+import pstats
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import markdown
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from pygments.formatters import HtmlFormatter
 import shutil
+from assets import build_assets
+from build_manifest import ArticleMeta, BuildManifest, hash_bytes, hash_file
+from build_profile import BUILD_PHASES, BuildProfile, timer
+from template_deps import template_hashes
+from search_index import build_search_index, encode
+from highlight_cache import HighlightCache, HighlightCacheExtension
+from output_writer import OutputWriter, write_if_changed
+from precompress import DEFAULT_LEVELS, available_encodings, compress, precompress, remove_sidecars
+from pagination import DEFAULT_PAGE_SIZE, group_by_tag, page_output_path, paginate
+from front_matter import parse_front_matter, read_front_matter, split_front_matter, summarize
+from sitemap import build_sitemaps, lastmod, robots_txt
+from feeds import FEED_FILENAME, FEED_TITLE, FEED_VERSION, atom_feed, latest_articles
 
 ARTICLES_DIR = Path("articles")
 DOCS_DIR = Path("docs")
 TEMPLATES_DIR = Path("templates")
+CACHE_DIR = Path(".build_cache")
+MANIFEST_PATH = CACHE_DIR / "manifest.json"
+HIGHLIGHT_CACHE_DIR = CACHE_DIR / "highlight"
+JINJA_CACHE_DIR = CACHE_DIR / "jinja2"
+SEARCH_DIR = DOCS_DIR / "search"
+# templates/ から docs/ 直下に出力するアセット（内容のハッシュを含むファイル名になる。CSSは縮小する）
+STATIC_FILES = ("style.css", "search.js")
+# サイトマップ・robots.txt に書く公開URL（例: https://example.github.io/blog）。未設定なら sitemap.xml は出力しない
+SITE_URL = os.environ.get("SITE_URL")
 
+MARKDOWN_EXTENSIONS = ["fenced_code", "tables", "codehilite"]
+PYGMENTS_STYLE = "monokai"
+PYGMENTS_CSS = "pygments.css"
+MARKDOWN_EXTENSION_CONFIGS = {"codehilite": {"noclasses": True, "pygments_style": PYGMENTS_STYLE}}
 
 
 # SEO用メタタグ生成
-import re
-
 def make_seo_meta(title, description, tags):
     return f'<meta property="og:title" content="{title}">\n<meta property="og:description" content="{description}">\n<meta name="keywords" content="{tags}">'
 
-def process_markdown_file(mdfile_path: Path, env: Environment, base_template, language_slug: str) -> dict:
-    """単一のMarkdownファイルを処理し、HTMLを生成してメタデータを返す"""
-    with open(mdfile_path, encoding="utf-8") as f:
-        mdtext = f.read()
-
-    fm = re.match(r"---\n(.*?)---\n", mdtext, re.DOTALL)
-    meta = {"title": "", "description": "", "tags": "", "slug": mdfile_path.stem, "language_slug": language_slug}
-    content_start_index = 0
-    if fm:
-        for line in fm.group(1).splitlines():
-            if line.startswith("title:"): meta["title"] = line[6:].strip()
-            if line.startswith("tags:"): meta["tags"] = line[5:].strip()
-            if line.startswith("description:"): meta["description"] = line[12:].strip() # descriptionを追加
-        content_start_index = fm.end()
-    
-    # Front Matterの後に本文が続く場合を考慮
-    article_content = mdtext[content_start_index:].strip()
-    if not meta["description"] and article_content:
-        # descriptionがFront Matterにない場合、記事の最初の段落から生成
-        first_paragraph = article_content.split('\n\n')[0] # 最初の段落を取得
-        meta["description"] = (first_paragraph[:150] + '...') if len(first_paragraph) > 150 else first_paragraph
+def markdown_extension_configs(css_classes: bool = False) -> dict:
+    """css_classes=True のときはトークンごとのインラインstyleではなくCSSクラスを出力する"""
+    configs = dict(MARKDOWN_EXTENSION_CONFIGS)
+    configs["codehilite"] = dict(configs["codehilite"], noclasses=not css_classes)
+    return configs
 
+def static_assets(css_classes: bool = False) -> dict:
+    """docs/ 直下に出力するアセット名 → (ハッシュ付きのファイル名, 内容)"""
+    sources = {name: (TEMPLATES_DIR / name).read_bytes() for name in STATIC_FILES}
+    if css_classes:
+        sources[PYGMENTS_CSS] = pygments_css().encode("utf-8")
+    return build_assets(sources)
 
-    html_content = markdown.markdown(article_content, extensions=["fenced_code", "tables", "codehilite"], extension_configs={"codehilite": {"noclasses": True, "pygments_style": "monokai"}})
-    seo = make_seo_meta(meta["title"], meta["description"], meta["tags"])
+def create_environment(css_classes: bool = False, assets: dict = None) -> Environment:
+    # コンパイル済みテンプレートをキャッシュし、ワーカーごとの再コンパイルを避ける。
+    # キャッシュはテンプレートのソースのチェックサムと照合されるため、編集すれば自動で無効になる。
+    JINJA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    env = Environment(loader=FileSystemLoader(str(TEMPLATES_DIR)), bytecode_cache=FileSystemBytecodeCache(str(JINJA_CACHE_DIR)))
+    if assets is None:
+        assets = static_assets(css_classes)
+    # テンプレートからは {{ assets["style.css"] }} でハッシュ付きのURLを参照する
+    env.globals["assets"] = {name: "/" + filename for name, (filename, _) in assets.items()}
+    # base.html はこの値があるときだけPygments用スタイルシートを読み込む
+    env.globals["pygments_css"] = env.globals["assets"].get(PYGMENTS_CSS)
+    return env
 
-    return {
-        "meta": meta,
-        "html": base_template.render(
-            title=meta["title"],
-            description=meta["description"],
+def create_markdown(highlight_cache: bool = False, css_classes: bool = False) -> markdown.Markdown:
+    extensions = list(MARKDOWN_EXTENSIONS)
+    if highlight_cache:
+        extensions.append(HighlightCacheExtension(cache_dir=str(HIGHLIGHT_CACHE_DIR)))
+    return markdown.Markdown(extensions=extensions, extension_configs=markdown_extension_configs(css_classes))
+
+def pygments_css() -> str:
+    """CSSクラスモード用に、Pygmentsスタイルから .codehilite 向けのスタイルシートを生成する"""
+    return HtmlFormatter(style=PYGMENTS_STYLE).get_style_defs(".codehilite") + "\n"
+
+def make_meta(fm_text, mdfile_path: Path, language_slug: str, first_paragraph: str = "") -> ArticleMeta:
+    """Front Matterから記事のメタデータを作る。description がなければ本文の最初の段落から生成する"""
+    fm = parse_front_matter(fm_text, mdfile_path)
+    description = fm["description"]
+    if not description and first_paragraph:
+        description = summarize(first_paragraph)
+    return ArticleMeta(fm["title"], description, fm["date"], tuple(fm["categories"]), tuple(fm["tags"]),
+                       mdfile_path.stem, language_slug)
+
+def read_article_meta(mdfile_path: Path, language_slug: str) -> ArticleMeta:
+    """本文をレンダリングせず、Front Matterと最初の段落だけからメタデータを作る"""
+    fm_text, first_paragraph = read_front_matter(mdfile_path)
+    return make_meta(fm_text, mdfile_path, language_slug, first_paragraph)
+
+def process_markdown_file(mdfile_path: Path, env: Environment, base_template, language_slug: str, md: markdown.Markdown = None) -> dict:
+    """単一のMarkdownファイルを処理し、HTMLを生成してメタデータを返す
+
+    md を渡した場合はそのインスタンスを reset() して使い回す。
+    拡張機能の初期化コストを避けるため、複数記事を処理する場合は create_markdown() で作った
+    インスタンスを渡すこと。
+    """
+    with timer.phase("read"):
+        with open(mdfile_path, encoding="utf-8") as f:
+            mdtext = f.read()
+
+    with timer.phase("front_matter"):
+        fm_text, body = split_front_matter(mdtext)
+        # Front Matterの後に本文が続く場合を考慮
+        article_content = body.strip()
+        # descriptionがFront Matterにない場合、記事の最初の段落から生成
+        meta = make_meta(fm_text, mdfile_path, language_slug, article_content.split('\n\n')[0])
+
+    if md is None:
+        md = create_markdown()
+    with timer.phase("markdown"):
+        html_content = md.reset().convert(article_content)
+    with timer.phase("template"):
+        seo = make_seo_meta(meta.title, meta.description, ", ".join(meta.tags))
+        html = base_template.render(
+            title=meta.title,
+            description=meta.description,
             content=html_content,
             seo=seo
         )
+
+    return {
+        "meta": meta,
+        "html": html
     }
 
-def build():
-    env = Environment(loader=FileSystemLoader(str(TEMPLATES_DIR)))
-    base_template = env.get_template("base.html")
-    main_index_template = env.get_template("main_index.html")
-    language_index_template = env.get_template("language_index.html")
+# 1回にワーカーへ渡す記事数と、同時に投入しておくまとまりの数（ワーカー1つあたり）
+RENDER_CHUNK_SIZE = 16
+RENDER_CHUNKS_PER_WORKER = 2
 
-    # docsディレクトリをクリーンアップして再作成
-    if DOCS_DIR.exists():
-        shutil.rmtree(DOCS_DIR)
-    DOCS_DIR.mkdir(exist_ok=True)
+class RenderResult:
+    """記事1件のレンダリング結果。HTMLは書き込み済みで、ここにはメタデータと書き込みの記録だけを持つ"""
+    __slots__ = ("meta", "written", "size", "times", "events")
 
-    # CSSファイルをdocs直下にコピー
-    shutil.copy(TEMPLATES_DIR / "style.css", DOCS_DIR / "style.css")
+    def __init__(self, meta: ArticleMeta, written: bool, size: int, times: tuple, events):
+        self.meta = meta
+        self.written = written  # 内容が変わって実際に書き込んだか
+        self.size = size  # HTMLのバイト数
+        self.times = times  # build_profile.ARTICLE_PHASES の順の秒数
+        self.events = events  # トレースを取るときだけ、トレース用の区間のリスト
 
-    all_languages_data = []
-    all_articles_data = [] # すべての記事のデータを格納するリスト
+# 並列ビルド用ワーカーの状態（プロセスごとに1つ）
+_worker_state = None
+
+def _init_worker(render_options: dict, trace: bool = False):
+    """ワーカープロセスごとにJinja2 EnvironmentとMarkdownインスタンスを用意する"""
+    global _worker_state
+    env = create_environment(render_options["css_classes"])
+    _worker_state = (env, env.get_template("base.html"), create_markdown(**render_options))
+    if trace:
+        timer.events = []
 
-    # 各言語のディレクトリを処理
-    for lang_dir in ARTICLES_DIR.iterdir():
+def article_output_path(mdfile: Path, language_slug: str) -> Path:
+    return DOCS_DIR / language_slug / (mdfile.stem + ".html")
+
+def _render_and_write(task, env: Environment, base_template, md: markdown.Markdown) -> RenderResult:
+    """記事をレンダリングしてその場で書き込む（HTMLを呼び出し元へ返さないので、記事数によらずメモリが一定）"""
+    source, language_slug, _ = task
+    mdfile = Path(source)
+    output_path = article_output_path(mdfile, language_slug)
+    start = time.perf_counter()
+    processed_data = process_markdown_file(mdfile, env, base_template, language_slug, md)
+    with timer.phase("write"):
+        data = processed_data["html"].encode("utf-8")
+        written = write_if_changed(output_path, data)
+    timer.record("article", start, time.perf_counter() - start, source)
+    return RenderResult(processed_data["meta"], written, len(data), timer.take(), timer.take_events())
+
+def _render_chunk(chunk):
+    env, base_template, md = _worker_state
+    return [_render_and_write(task, env, base_template, md) for task in chunk]
+
+def render_articles(tasks, jobs: int, render_options: dict, trace: bool = False):
+    """(ソースのパス, language_slug, ソースのハッシュ) のリストをレンダリングして書き込み、入力と同じ順序で RenderResult を返す
+
+    render_options は create_markdown() のキーワード引数（highlight_cache, css_classes）。
+    並列ビルドでも投入しておく記事は jobs * RENDER_CHUNKS_PER_WORKER * RENDER_CHUNK_SIZE 件までにし、
+    呼び出し元が結果を受け取るまで次を投入しない。
+    """
+    if jobs <= 1 or len(tasks) <= 1:
+        env = create_environment(render_options["css_classes"])
+        base_template = env.get_template("base.html")
+        md = create_markdown(**render_options)
+        for task in tasks:
+            yield _render_and_write(task, env, base_template, md)
+        return
+    chunks = (tasks[i:i + RENDER_CHUNK_SIZE] for i in range(0, len(tasks), RENDER_CHUNK_SIZE))
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(render_options, trace)) as executor:
+        # 投入順に結果を受け取るため、出力順は逐次ビルドと一致する
+        for chunk in chunks:
+            if len(in_flight) >= jobs * RENDER_CHUNKS_PER_WORKER:
+                yield from in_flight.popleft().result()
+            in_flight.append(executor.submit(_render_chunk, chunk))
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+ARTICLE_TEMPLATE = "base.html"
+INDEX_TEMPLATES = ("language_index.html", "main_index.html", "tag_index.html")
+
+def article_template_hashes(env: Environment) -> dict:
+    """記事ページが依存するテンプレート（base.html と、そこから extends/include されるもの）のハッシュ"""
+    return template_hashes(env, ARTICLE_TEMPLATE)
+
+class PageCache:
+    """一覧ページの出力パス → 前回描画したときの入力（依存テンプレートのハッシュとページの内容）のハッシュ
+
+    入力が前回と同じで出力も残っているページは描画し直さない。記録はマニフェストに保存してビルドをまたいで使う
+    （開発サーバーで描画したページも、次の build_site.py が正しく判断できるように同じ記録を更新する）。
+    remember_inputs=True なら最後に見た入力そのものも持ち、同じ入力ならハッシュを計算しない（開発サーバー用。
+    メタデータは同じオブジェクトなら同一とみなせるので、比較はほぼ参照の比較で済む）。
+    """
+
+    def __init__(self, entries: dict = None, remember_inputs: bool = False):
+        self.entries = dict(entries or {})
+        self.inputs = {} if remember_inputs else None  # 出力パス → (template_key, inputs)
+        self.rendered = 0
+        self.skipped = 0
+
+    def _key(self, template_key, inputs):
+        return template_key + ":" + hash_bytes(json.dumps(inputs, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8"))
+
+    def needs_render(self, output_path: Path, template_key, inputs) -> bool:
+        """前回と入力が違えば記録を更新して True を返す"""
+        path = output_path.as_posix()
+        if self.inputs is not None and self.inputs.get(path) == (template_key, inputs) and output_path.exists():
+            self.skipped += 1
+            return False
+        key = self._key(template_key, inputs)
+        if self.inputs is not None:
+            self.inputs[path] = (template_key, inputs)
+        if self.entries.get(path) == key and output_path.exists():
+            self.skipped += 1
+            return False
+        self.entries[path] = key
+        self.rendered += 1
+        return True
+
+    def retain(self, outputs):
+        """今回出力しなかったページの記録を捨てる"""
+        current = {Path(path).as_posix() for path in outputs}
+        self.entries = {path: key for path, key in self.entries.items() if path in current}
+        if self.inputs is not None:
+            self.inputs = {path: inputs for path, inputs in self.inputs.items() if path in current}
+
+def render_settings_hash(env: Environment, css_classes: bool = False) -> str:
+    """全記事の出力に影響するビルド設定のハッシュ（アセットのURLが変われば全ページを描画し直す）"""
+    settings = {"extensions": MARKDOWN_EXTENSIONS, "extension_configs": markdown_extension_configs(css_classes),
+                "assets": env.globals["assets"]}
+    return hash_bytes(json.dumps(settings, sort_keys=True).encode("utf-8"))
+
+def iter_languages():
+    """articles/ 配下の言語ディレクトリごとに (language_name, language_slug, [mdfile, ...]) を返す"""
+    for lang_dir in sorted(ARTICLES_DIR.iterdir()):
         if lang_dir.is_dir():
             language_name = lang_dir.name.capitalize() # 例: python -> Python
             language_slug = lang_dir.name.lower() # 例: python
+            yield language_name, language_slug, sorted(lang_dir.glob("*.md"))
 
-            (DOCS_DIR / language_slug).mkdir(exist_ok=True)
-            
-            articles_in_lang = []
-            # 言語ディレクトリ内のMarkdownファイルを処理
-            for mdfile in sorted(lang_dir.glob("*.md")):
-                processed_data = process_markdown_file(mdfile, env, base_template, language_slug)
-                
-                # 個別記事のHTMLを保存
-                output_path = DOCS_DIR / language_slug / (processed_data["meta"]["slug"] + ".html")
-                with open(output_path, "w", encoding="utf-8") as f:
-                    f.write(processed_data["html"])
-                
-                articles_in_lang.append(processed_data["meta"])
-                all_articles_data.append(processed_data["meta"]) # すべての記事のリストにも追加
-            
-            # 言語別インデックスページの生成
-            lang_index_html = language_index_template.render(
+def write_indexes(env: Environment, languages, writer: OutputWriter, page_size: int = DEFAULT_PAGE_SIZE, page_cache: PageCache = None, site_url: str = SITE_URL) -> list:
+    """言語別インデックス・メインインデックス・タグ別一覧と、言語別・サイト全体のAtomフィードを生成し、出力したパスのリストを返す
+
+    languages は (language_name, language_slug, [meta, ...]) のリスト。
+    記事一覧は page_size 件ごとに /page/N/ 以下のページへ分割する。
+    page_cache（PageCache）を渡すと、依存テンプレートもページの内容も前回と同じページは描画しない。
+    フィードも、載せる新着記事（上位 FEED_ENTRIES 件）が前回と同じなら作り直さない。
+    """
+    main_index_template = env.get_template("main_index.html")
+    language_index_template = env.get_template("language_index.html")
+    tag_index_template = env.get_template("tag_index.html")
+    # テンプレートごとに、extends/include 先まで含めた依存テンプレートとアセットのURLのハッシュ
+    template_keys = {} if page_cache is None else {
+        name: hash_bytes(json.dumps([template_hashes(env, name), env.globals["assets"]], sort_keys=True).encode("utf-8"))
+        for name in INDEX_TEMPLATES
+    }
+    outputs = []
+
+    def write_page(output_path, template, inputs, **context):
+        outputs.append(output_path)
+        if page_cache is not None and not page_cache.needs_render(output_path, template_keys[template.name], inputs):
+            return
+        writer.write_text(output_path, template.render(**context))
+
+    def write_feed(output_path, title, page_path, articles):
+        outputs.append(output_path)
+        latest = latest_articles(articles)
+        if page_cache is not None and not page_cache.needs_render(output_path, f"feed-{FEED_VERSION}", (title, site_url, latest)):
+            return
+        writer.write_text(output_path, atom_feed(title, output_url(output_path), page_path, latest, site_url))
+
+    all_languages_data = []
+    all_articles_data = [] # すべての記事のデータを格納するリスト
+    for language_name, language_slug, articles_in_lang in languages:
+        all_articles_data.extend(articles_in_lang) # すべての記事のリストにも追加
+
+        # 言語別インデックスページの生成
+        base_url = f"/{language_slug}/"
+        for page, articles_page, pagination in paginate(articles_in_lang, page_size, base_url):
+            write_page(
+                page_output_path(DOCS_DIR, base_url, page), language_index_template,
+                (language_name, articles_page, pagination),
                 language_name=language_name,
-                articles=articles_in_lang,
+                articles=articles_page,
+                pagination=pagination,
+                feed_url=f"{base_url}{FEED_FILENAME}",
+                feed_title=f"{FEED_TITLE} - {language_name}",
                 title=f"{language_name} 学習ロードマップ",
                 description=f"{language_name} の学習ロードマップです。",
                 seo=make_seo_meta(f"{language_name} 学習ロードマップ", f"{language_name} の学習ロードマップです。", f"{language_name}, 学習, ロードマップ")
             )
-            with open(DOCS_DIR / language_slug / "index.html", "w", encoding="utf-8") as f:
-                f.write(lang_index_html)
-            
-            all_languages_data.append((language_name, language_slug))
-    
+
+        # 言語別のAtomフィード
+        write_feed(DOCS_DIR / language_slug / FEED_FILENAME, f"{FEED_TITLE} - {language_name}", base_url, articles_in_lang)
+
+        all_languages_data.append((language_name, language_slug))
+
     # メインインデックスページの生成
-    main_index_html = main_index_template.render(
-        languages=all_languages_data,
-        articles=all_articles_data, # すべての記事のデータを渡す
-        title="IT学習ブログ - ロードマップ",
-        description="IT学習ブログのプログラミング言語別学習ロードマップです。",
-        seo=make_seo_meta("IT学習ブログ - ロードマップ", "IT学習ブログのプログラミング言語別学習ロードマップです。", "IT, 学習, プログラミング, ロードマップ")
+    for page, articles_page, pagination in paginate(all_articles_data, page_size, "/"):
+        write_page(
+            page_output_path(DOCS_DIR, "/", page), main_index_template,
+            (all_languages_data, articles_page, pagination),
+            languages=all_languages_data,
+            articles=articles_page, # すべての記事のデータを渡す
+            pagination=pagination,
+            title="IT学習ブログ - ロードマップ",
+            description="IT学習ブログのプログラミング言語別学習ロードマップです。",
+            seo=make_seo_meta("IT学習ブログ - ロードマップ", "IT学習ブログのプログラミング言語別学習ロードマップです。", "IT, 学習, プログラミング, ロードマップ")
+        )
+
+    # サイト全体のAtomフィード
+    write_feed(DOCS_DIR / FEED_FILENAME, FEED_TITLE, "/", all_articles_data)
+
+    # タグ別の記事一覧とタグ一覧
+    tag_groups = group_by_tag(all_articles_data)
+    for tag, slug, tagged_articles in tag_groups:
+        base_url = f"/tags/{slug}/"
+        for page, articles_page, pagination in paginate(tagged_articles, page_size, base_url):
+            write_page(
+                page_output_path(DOCS_DIR, base_url, page), tag_index_template,
+                (tag, articles_page, pagination),
+                tag=tag,
+                articles=articles_page,
+                pagination=pagination,
+                title=f"タグ: {tag}",
+                description=f"「{tag}」タグの記事一覧です。",
+                seo=make_seo_meta(f"タグ: {tag}", f"「{tag}」タグの記事一覧です。", tag)
+            )
+    tags = [(tag, slug, len(tagged_articles)) for tag, slug, tagged_articles in tag_groups]
+    write_page(
+        DOCS_DIR / "tags" / "index.html", tag_index_template, tags,
+        tags=tags,
+        title="タグ一覧",
+        description="IT学習ブログのタグ一覧です。",
+        seo=make_seo_meta("タグ一覧", "IT学習ブログのタグ一覧です。", "IT, 学習, タグ")
     )
-    with open(DOCS_DIR / "index.html", "w", encoding="utf-8") as f:
-        f.write(main_index_html)
+    return outputs
+
+def write_search_index(env: Environment, metas: list, writer: OutputWriter) -> list:
+    """検索ページと検索インデックス（docs/search/）を出力し、出力したパスのリストを返す"""
+    start = time.perf_counter()
+    files = build_search_index(metas)
+    index_meta = files["meta.json"]
+    outputs = []
+    total_bytes = 0
+    # 書き込んだファイルの値は辞書から外し、インデックス全体を二重に持たないようにする
+    for name in list(files):
+        data = encode(files.pop(name))
+        total_bytes += len(data)
+        outputs.append(SEARCH_DIR / name)
+        writer.write_bytes(outputs[-1], data)
+    outputs.append(SEARCH_DIR / "index.html")
+    writer.write_text(outputs[-1], env.get_template("search.html").render(
+        title="記事を検索",
+        description="IT学習ブログの記事を検索します。",
+        seo=make_seo_meta("記事を検索", "IT学習ブログの記事を検索します。", "IT, 学習, 検索")
+    ))
+    print(f"検索インデックス: 記事 {index_meta['docs']} 件・語 {index_meta['terms']} 個・シャード {index_meta['shards']} 個"
+          f"（ほかに単独ファイルの語 {len(index_meta['large'])} 個）、"
+          f"合計 {total_bytes / 1024:.1f} KB（{(time.perf_counter() - start) * 1000:.0f} ms）")
+    return outputs
+
+def output_url(path: Path) -> str:
+    """docs/ 以下の出力パスをURLにする（index.html はディレクトリのURLにする）"""
+    url = "/" + path.relative_to(DOCS_DIR).as_posix()
+    return url[:-len("index.html")] if url.endswith("/index.html") else url
+
+def write_sitemaps(site_url: str, articles, index_outputs, writer: OutputWriter, manifest: BuildManifest = None) -> list:
+    """robots.txt と sitemap.xml（大きなサイトではサイトマップインデックスと分割したサイトマップ）を出力し、出力したパスのリストを返す
+
+    articles は (meta, ソースの内容が最後に変わった日 or None) のリスト。記事の lastmod はFront Matterの日付と
+    ソースが変わった日の新しいほうにする。一覧ページは載せる記事によって変わるため lastmod を付けない。
+    分割したサイトマップは、manifest に記録した圧縮前の内容と同じなら圧縮し直さない。
+    """
+    outputs = [DOCS_DIR / "robots.txt"]
+    writer.write_text(outputs[0], robots_txt(site_url))
+    if not site_url:
+        print("サイトのURL（--site-url または環境変数 SITE_URL）が未設定のため、sitemap.xml は出力しません。")
+        return outputs
+    sections = {}
+    for meta, modified in articles:
+        sections.setdefault(meta.language_slug, []).append(
+            (f"/{meta.language_slug}/{meta.slug}.html", lastmod(meta.date, modified)))
+    sections["pages"] = [(output_url(path), None) for path in index_outputs
+                         if path.name == "index.html" and SEARCH_DIR not in path.parents]
+    hashes = {}
+    for name, data in build_sitemaps(site_url, sections).items():
+        path = DOCS_DIR / name
+        outputs.append(path)
+        if name.endswith(".gz"):
+            hashes[name] = hash_bytes(data)
+            if manifest is not None and manifest.sitemap_hashes.get(name) == hashes[name] and path.exists():
+                writer.record(path, False, 0)
+                continue
+            data = compress(data, "gzip", DEFAULT_LEVELS["gzip"])
+        writer.write_bytes(path, data)
+    if manifest is not None:
+        manifest.sitemap_hashes = hashes
+    return outputs
+
+def update_sitemap_outputs(manifest: BuildManifest, outputs):
+    """前回出力して今回は出力しなかったサイトマップ（分割をやめた場合など）を削除し、記録を更新する"""
+    remove_stale_outputs(manifest.sitemap_outputs, outputs)
+    manifest.sitemap_outputs = [path.as_posix() for path in outputs]
+
+def remove_stale_outputs(previous, current):
+    """前回出力して今回は出力しなかったファイルを削除し、空になったディレクトリも片付ける"""
+    current = {Path(path).as_posix() for path in current}
+    for path in sorted(set(previous) - current):
+        path = Path(path)
+        if path.exists():
+            path.unlink()
+        remove_sidecars(path)
+        parent = path.parent
+        while parent != DOCS_DIR and parent.exists() and not any(parent.iterdir()):
+            parent.rmdir()
+            parent = parent.parent
+
+def write_assets(assets: dict, writer: OutputWriter, manifest: BuildManifest = None) -> list:
+    """ハッシュ付きのファイル名でアセットを出力し、出力したパスのリストを返す
+
+    前回までのアセットは、まだそれを参照しているページがありうるため、ここでは削除せずマニフェストに残す
+    （全ページを描画し終えてから remove_stale_outputs() で削除する）。
+    """
+    outputs = []
+    for filename, data in assets.values():
+        outputs.append(DOCS_DIR / filename)
+        writer.write_bytes(outputs[-1], data)
+    if manifest is None:
+        return outputs
+    # マニフェストに記録がなければ、ハッシュなしのファイル名で出力していたころのファイルを前回の出力とみなす
+    previous = manifest.asset_outputs or [(DOCS_DIR / name).as_posix() for name in (*STATIC_FILES, PYGMENTS_CSS)]
+    manifest.asset_outputs = sorted(set(previous) | {path.as_posix() for path in outputs})
+    return outputs
+
+def precompression_levels(gzip_level: int = DEFAULT_LEVELS["gzip"], zstd_level: int = DEFAULT_LEVELS["zstd"]) -> dict:
+    """使えるエンコーディング → 圧縮レベル（zstd は zstandard がインストールされている場合だけ）"""
+    levels = {"gzip": gzip_level, "zstd": zstd_level}
+    return {encoding: levels[encoding] for encoding in available_encodings()}
+
+def update_precompressed(manifest: BuildManifest, written, levels: dict):
+    """今回書き換えた出力の圧縮ファイルを作り直す。levels が空なら前回までの圧縮ファイルを削除する"""
+    if levels or manifest.precompress:
+        with timer.phase("precompress"):
+            report = precompress(DOCS_DIR, written, levels, everything=manifest.precompress != levels,
+                                 incompressible=manifest.incompressible)
+        if levels:
+            print(report.summary())
+        manifest.incompressible = report.incompressible if levels else {}
+    manifest.precompress = levels
+
+def build_indexes_only(css_classes: bool = False, page_size: int = DEFAULT_PAGE_SIZE, site_url: str = SITE_URL):
+    """記事本文をレンダリングせず、Front Matterだけからインデックスページを作り直す
+
+    各記事は閉じの --- と最初の段落までしか読まないため、所要時間は記事数に比例し、
+    本文の総量には依存しない。記事ページには触れない。
+    """
+    assets = static_assets(css_classes)
+    env = create_environment(css_classes, assets)
+    writer = OutputWriter()
+    DOCS_DIR.mkdir(exist_ok=True)
+    languages = []
+    sources = []
+    for language_name, language_slug, mdfiles in iter_languages():
+        languages.append((language_name, language_slug, [read_article_meta(mdfile, language_slug) for mdfile in mdfiles]))
+        sources += [mdfile.as_posix() for mdfile in mdfiles]
+    # ページ数が減った場合などに備え、マニフェストがあれば不要になった一覧ページを削除する
+    manifest = BuildManifest.load(MANIFEST_PATH)
+    page_cache = PageCache(manifest.index_pages if manifest is not None else None)
+    index_outputs = write_indexes(env, languages, writer, page_size, page_cache, site_url)
+    # 一覧ページが参照するアセットは、マニフェストがなくても（クローン直後でも）出力する。
+    # 記事ページは前回のアセットを参照したままのことがあるため、古いアセットは次のフルビルドまで残す
+    write_assets(assets, writer, manifest)
+    all_metas = [meta for _, _, metas in languages for meta in metas]
+    index_outputs += write_search_index(env, all_metas, writer)
+    articles = [(meta, manifest.get_modified(source) if manifest is not None else None) for meta, source in zip(all_metas, sources)]
+    sitemap_outputs = write_sitemaps(site_url, articles, index_outputs, writer, manifest)
+    if manifest is not None:
+        update_sitemap_outputs(manifest, sitemap_outputs)
+        remove_stale_outputs(manifest.index_outputs, index_outputs)
+        page_cache.retain(index_outputs)
+        manifest.index_outputs = [path.as_posix() for path in index_outputs]
+        manifest.index_pages = page_cache.entries
+        # 圧縮の設定は前回のビルドのものを引き継ぐ
+        update_precompressed(manifest, writer.written, manifest.precompress)
+        manifest.save()
+    print(f"記事 {sum(len(metas) for _, _, metas in languages)} 件のメタデータからインデックスを再生成しました（一覧ページ {page_cache.rendered + page_cache.skipped} 件中 {page_cache.rendered} 件を描画）。")
+    print(writer.summary())
+
+def build(clean: bool = False, jobs: int = 1, highlight_cache: bool = True, highlight_cache_mb: int = 64, css_classes: bool = False, page_size: int = DEFAULT_PAGE_SIZE, precompress_levels: dict = None, profile: BuildProfile = None, site_url: str = SITE_URL):
+    """precompress_levels（エンコーディング → 圧縮レベル）を渡すと、HTML/CSS/JS/JSON の圧縮ファイルも出力する
+
+    site_url（公開URL）を渡すと sitemap.xml も出力する。
+
+    profile（BuildProfile）を渡すと、フェーズごとの所要時間と書き込んだバイト数を記録する。
+    """
+    if page_size < 1:
+        raise ValueError(f"1ページあたりの記事数は1以上にしてください: {page_size}")
+    build_start = time.perf_counter()
+    trace = profile is not None and profile.trace
+    if trace:
+        timer.events = []
+    assets = static_assets(css_classes)
+    env = create_environment(css_classes, assets)
+
+    settings = render_settings_hash(env, css_classes)
+    render_options = {"highlight_cache": highlight_cache, "css_classes": css_classes}
+    article_templates = article_template_hashes(env)
+
+    # マニフェストがない（初回・形式変更）場合は従来どおりdocsを作り直す
+    manifest = None if clean else BuildManifest.load(MANIFEST_PATH)
+    if manifest is None:
+        if DOCS_DIR.exists():
+            shutil.rmtree(DOCS_DIR)
+        manifest = BuildManifest(MANIFEST_PATH, settings)
+    DOCS_DIR.mkdir(exist_ok=True)
+    writer = OutputWriter()
+
+    # CSS・検索用スクリプトをdocs直下に出力する。
+    # CSSクラスモードではコードハイライト用のスタイルシートを1つだけ生成して全ページで共有する
+    asset_outputs = write_assets(assets, writer, manifest)
+
+    # 各言語のディレクトリを走査し、再生成が必要な記事を洗い出す
+    languages = [] # (language_name, language_slug, [source, ...])
+    # 再生成する記事。全記事分を持つことがあるので、Path を作らず文字列のタプルで持つ
+    tasks = [] # (source, language_slug, source_hash)
+    with timer.phase("scan"):
+        for language_name, language_slug, mdfiles in iter_languages():
+            (DOCS_DIR / language_slug).mkdir(exist_ok=True)
+
+            sources = []
+            for mdfile in mdfiles:
+                source = mdfile.as_posix()
+                source_hash = hash_file(mdfile)
+                sources.append(source)
+                # ソースもテンプレートも変わっていなければ出力はそのまま残す
+                if not manifest.is_fresh(source, source_hash, article_templates, article_output_path(mdfile, language_slug), settings):
+                    tasks.append((source, language_slug, source_hash))
+            languages.append((language_name, language_slug, sources))
+
+    # 変更のあった記事だけをレンダリングし、個別記事のHTMLを保存（書き込みはワーカーが行う）
+    for (source, language_slug, source_hash), result in zip(tasks, render_articles(tasks, jobs, render_options, trace)):
+        output_path = article_output_path(Path(source), language_slug)
+        writer.record(output_path, result.written, result.size)
+        manifest.record(source, source_hash, article_templates, output_path, result.meta)
+        if profile is not None:
+            profile.add_article(result.times, source, result.events)
+
+    seen_sources = [source for _, _, sources in languages for source in sources]
+    # 一覧ページは、依存テンプレートと載せる記事のメタデータが前回と同じなら描画しない
+    page_cache = PageCache(manifest.index_pages)
+    with timer.phase("index_pages"):
+        index_outputs = write_indexes(env, [(language_name, language_slug, [manifest.get_meta(source) for source in sources])
+                                            for language_name, language_slug, sources in languages], writer, page_size, page_cache, site_url)
+    with timer.phase("search_index"):
+        index_outputs += write_search_index(env, [manifest.get_meta(source) for source in seen_sources], writer)
+    with timer.phase("sitemap"):
+        sitemap_outputs = write_sitemaps(site_url, [(manifest.get_meta(source), manifest.get_modified(source)) for source in seen_sources],
+                                         index_outputs, writer, manifest)
+
+    # ソースが削除された記事の出力を削除
+    for output_path in manifest.remove_stale(seen_sources):
+        if output_path.exists():
+            output_path.unlink()
+        remove_sidecars(output_path)
+    # ページ数の減少や言語・タグの削除で不要になった一覧ページと、どのページも参照しなくなったアセットを削除
+    remove_stale_outputs(manifest.index_outputs, index_outputs)
+    remove_stale_outputs(manifest.asset_outputs, asset_outputs)
+    manifest.asset_outputs = [path.as_posix() for path in asset_outputs]
+    update_sitemap_outputs(manifest, sitemap_outputs)
+    page_cache.retain(index_outputs)
+    manifest.index_outputs = [path.as_posix() for path in index_outputs]
+    manifest.index_pages = page_cache.entries
+    # 記事がすべて削除された言語のディレクトリを片付ける
+    for lang_dir in DOCS_DIR.iterdir():
+        if lang_dir.is_dir() and not any(lang_dir.iterdir()):
+            lang_dir.rmdir()
+
+    update_precompressed(manifest, writer.written, precompress_levels or {})
+    manifest.settings = settings
+    manifest.save()
+    if highlight_cache:
+        HighlightCache(HIGHLIGHT_CACHE_DIR).evict(highlight_cache_mb * 1024 * 1024)
+    build_phases = dict(zip(BUILD_PHASES, timer.take(BUILD_PHASES)))
+    if profile is not None:
+        profile.add_phases(build_phases)
+        profile.bytes_written = writer.bytes_written
+        profile.wall_seconds = time.perf_counter() - build_start
+        if trace:
+            profile.events.extend(timer.take_events())
+            timer.events = None
+    print(f"記事 {len(seen_sources)} 件中 {len(tasks)} 件、一覧ページ {page_cache.rendered + page_cache.skipped} 件中 {page_cache.rendered} 件を再生成しました。")
+    print(writer.summary())
+
+def page_size_arg(value: str) -> int:
+    """--page-size の値（1以上の整数）。0以下だと記事を描画し終えた後の一覧ページ生成で失敗するため、起動時に弾く"""
+    page_size = int(value)
+    if page_size < 1:
+        raise argparse.ArgumentTypeError(f"1以上の整数を指定してください: {value}")
+    return page_size
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="articles/ のMarkdownを docs/ にHTML変換します。")
+    parser.add_argument("--clean", action="store_true", help="マニフェストを無視してdocs/を作り直す（フルビルド）")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="記事レンダリングの並列プロセス数（0でCPU数）")
+    parser.add_argument("--no-highlight-cache", dest="highlight_cache", action="store_false", help="コードハイライト結果のキャッシュを使わない")
+    parser.add_argument("--highlight-cache-mb", type=int, default=64, help="ハイライトキャッシュの上限サイズ(MB)。超えた分は古いものから削除")
+    parser.add_argument("--css-classes", action="store_true", help="コードハイライトをインラインstyleではなくCSSクラス＋共有スタイルシートで出力する")
+    parser.add_argument("--index-only", action="store_true", help="記事本文はレンダリングせず、Front Matterからインデックスページだけを再生成する")
+    parser.add_argument("--page-size", type=page_size_arg, default=DEFAULT_PAGE_SIZE, help="一覧ページ1ページあたりの記事数")
+    parser.add_argument("--precompress", action="store_true", help="HTML/CSS/JS/JSONの隣に .gz（zstandard があれば .zst も）を出力する")
+    parser.add_argument("--gzip-level", type=int, default=DEFAULT_LEVELS["gzip"], help="--precompress のgzip圧縮レベル（1〜9）")
+    parser.add_argument("--zstd-level", type=int, default=DEFAULT_LEVELS["zstd"], help="--precompress のzstd圧縮レベル（1〜22）")
+    parser.add_argument("--site-url", default=SITE_URL, help="サイトの公開URL（sitemap.xml・robots.txt に使う。既定は環境変数 SITE_URL）")
+    parser.add_argument("--profile", action="store_true", help="フェーズごと・記事ごとの所要時間を計測し、時間のかかった記事を表示する")
+    parser.add_argument("--profile-top", type=int, default=10, help="--profile で表示する記事の件数")
+    parser.add_argument("--profile-trace", type=Path, help="Chromeのトレース形式（chrome://tracing・Perfettoで開ける）のJSONを書き出す")
+    parser.add_argument("--profile-pstats", type=Path, help="cProfileの結果をpstats形式で書き出す（計測するのはメインプロセスだけ）")
+    args = parser.parse_args(argv)
+    if args.profile_trace or args.profile_pstats:
+        args.profile = True
+    if args.jobs == 0:
+        args.jobs = os.cpu_count() or 1
+    return args
 
 if __name__ == "__main__":
-    build()
+    args = parse_args()
+    if args.index_only:
+        build_indexes_only(css_classes=args.css_classes, page_size=args.page_size, site_url=args.site_url)
+    else:
+        levels = precompression_levels(args.gzip_level, args.zstd_level) if args.precompress else None
+        profile = BuildProfile(trace=args.profile_trace is not None) if args.profile else None
+        profiler = cProfile.Profile() if args.profile_pstats else None
+        if profiler is not None:
+            profiler.enable()
+        build(clean=args.clean, jobs=args.jobs, highlight_cache=args.highlight_cache, highlight_cache_mb=args.highlight_cache_mb, css_classes=args.css_classes, page_size=args.page_size, precompress_levels=levels, profile=profile, site_url=args.site_url)
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile_pstats)
+            if args.jobs > 1:
+                print("注意: 並列ビルドではワーカープロセスでの処理はcProfileの結果に含まれません（-j 1 で計測してください）。")
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+            print(f"cProfileの結果を {args.profile_pstats} に保存しました（python -m pstats {args.profile_pstats} で詳しく見られます）。")
+        if profile is not None:
+            print(profile.report(args.profile_top))
+            if args.profile_trace:
+                profile.write_trace(args.profile_trace)
+                print(f"トレースを {args.profile_trace} に保存しました。")
@@ -0,0 +1,39 @@
+# コードハイライトのCSSクラス化によるページサイズ削減レポート
+# 各記事をインラインstyle（従来）とCSSクラス＋共有スタイルシートの両方でレンダリングし、
+# ページごとのバイト数と削減量を表示する
+#
+# 使い方: python scripts/css_savings_report.py
+
+from build_site import ARTICLES_DIR, create_environment, create_markdown, process_markdown_file, pygments_css
+
+
+def render_sizes(css_classes: bool) -> dict:
+    env = create_environment(css_classes)
+    base_template = env.get_template("base.html")
+    md = create_markdown(css_classes=css_classes)
+    sizes = {}
+    for mdfile in sorted(ARTICLES_DIR.glob("*/*.md")):
+        processed_data = process_markdown_file(mdfile, env, base_template, mdfile.parent.name.lower(), md)
+        sizes[mdfile.relative_to(ARTICLES_DIR).as_posix()] = len(processed_data["html"].encode("utf-8"))
+    return sizes
+
+
+def main():
+    inline_sizes = render_sizes(css_classes=False)
+    class_sizes = render_sizes(css_classes=True)
+    stylesheet_size = len(pygments_css().encode("utf-8"))
+
+    print(f"{'ページ':60s} {'inline':>9s} {'class':>9s} {'削減':>9s}")
+    for page, inline_size in inline_sizes.items():
+        class_size = class_sizes[page]
+        saved = inline_size - class_size
+        print(f"{page:60s} {inline_size:9d} {class_size:9d} {saved:9d} ({saved / inline_size:6.1%})")
+
+    inline_total = sum(inline_sizes.values())
+    class_total = sum(class_sizes.values())
+    print(f"\n合計: inline {inline_total} B / class {class_total} B + 共有スタイルシート {stylesheet_size} B")
+    print(f"削減量: {inline_total - class_total - stylesheet_size} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# オフラインテスト用の偽LLMサーバー
+# HTTPBackend と同じ形式（POST {"model", "prompt"} → {"article_body"}）で応答する
+#
+# レート制限（429 + Retry-After）やサーバーエラー（503）を意図的に返し、リトライ処理を試せる
+# （--reject-rate の確率で、再試行しても成功しない 400 を返す）
+# "stream": true のリクエストには本文を Server-Sent Events（chunked転送）で少しずつ返す
+# （--truncate-rate の確率で、本文の途中で [DONE] を送らずにストリームを終える）
+#
+# 使い方: python scripts/fake_llm_server.py --port 8765 --latency 0.2 [--throttle-rpm 60] [--error-rate 0.1] [--reject-rate 0.05]
+#         [--body-kb 512 --chunk-delay 0.01]（長い本文をゆっくりストリーミングする） [--truncate-rate 0.1]
+#         python scripts/generate_articles.py Python --fill --backend http --url http://127.0.0.1:8765/generate
+
+import argparse
+import collections
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_backends import stub_article_body
+
+
+def padded_article_body(prompt: str, body_kb: int = 0) -> str:
+    """スタブの本文を、段落を繰り返して body_kb キロバイト程度まで伸ばす"""
+    body = stub_article_body(prompt)
+    paragraph = "\n## 補足\n\n長い記事のストリーミングを試すための段落です。" * 4 + "\n"
+    size = len(body.encode("utf-8"))
+    repeat = max(0, body_kb * 1024 - size) // len(paragraph.encode("utf-8"))
+    return body + paragraph * repeat
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    server_version = "FakeLLM/0.1"
+    protocol_version = "HTTP/1.1"  # chunked転送のため
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_stream(self, body: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        size = self.server.chunk_chars
+        end = len(body)
+        if self.server.inject_truncation():
+            end = len(body) // 2  # 途中までしか送らない
+        for start in range(0, end, size):
+            if start and self.server.chunk_delay:
+                time.sleep(self.server.chunk_delay)
+            event = json.dumps({"delta": body[start:min(start + size, end)]}, ensure_ascii=False)
+            self._send_chunk(f"data: {event}\n\n".encode("utf-8"))
+        if end == len(body):
+            self._send_chunk(b"data: [DONE]\n\n")
+        self._send_chunk(b"")  # 終端のチャンク
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length))
+            prompt = request["prompt"]
+            stream = bool(request.get("stream"))
+        except (ValueError, KeyError):
+            self._send_json(400, {"error": "prompt が必要です"})
+            return
+        retry_after = self.server.check_throttle()
+        if retry_after is not None:
+            self.send_response(429)
+            self.send_header("Retry-After", f"{retry_after:.3f}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.server.inject_error():
+            self._send_json(503, {"error": "injected failure"})
+            return
+        if self.server.inject_rejection():
+            self._send_json(400, {"error": "injected rejection"})
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = padded_article_body(prompt, self.server.body_kb)
+        if stream:
+            self._send_stream(body)
+        else:
+            self._send_json(200, {"article_body": body})
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, latency: float = 0.0, throttle_rpm: int = 0, error_rate: float = 0.0,
+                 seed: int = None, verbose: bool = False, body_kb: int = 0, chunk_chars: int = 256, chunk_delay: float = 0.0,
+                 truncate_rate: float = 0.0, reject_rate: float = 0.0, throttle_window: float = 60.0):
+        super().__init__(address, FakeLLMHandler)
+        self.latency = latency
+        self.throttle_rpm = throttle_rpm
+        self.error_rate = error_rate
+        self.reject_rate = reject_rate
+        self.throttle_window = throttle_window  # throttle_rpm を数える期間（秒）。テストでは短くする
+        self.verbose = verbose
+        self.body_kb = body_kb
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.truncate_rate = truncate_rate
+        self.requests = 0  # 受け付けた（429を返さなかった）リクエスト数
+        self.throttled = 0
+        self.errors = 0
+        self.rejected = 0
+        self.truncated = 0
+        self._accepted = collections.deque()  # 直近 throttle_window 秒に受け付けた時刻
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def check_throttle(self):
+        """直近 throttle_window 秒（既定60秒）の受付数が throttle_rpm に達していれば、空きが出るまでの秒数を返す"""
+        with self._lock:
+            now = time.monotonic()
+            while self._accepted and now - self._accepted[0] >= self.throttle_window:
+                self._accepted.popleft()
+            if self.throttle_rpm and len(self._accepted) >= self.throttle_rpm:
+                self.throttled += 1
+                return self.throttle_window - (now - self._accepted[0])
+            self._accepted.append(now)
+            self.requests += 1
+            return None
+
+    def inject_error(self) -> bool:
+        with self._lock:
+            if self._random.random() < self.error_rate:
+                self.errors += 1
+                return True
+            return False
+
+    def inject_rejection(self) -> bool:
+        with self._lock:
+            if self.reject_rate and self._random.random() < self.reject_rate:
+                self.rejected += 1
+                return True
+            return False
+
+    def inject_truncation(self) -> bool:
+        with self._lock:
+            if self.truncate_rate and self._random.random() < self.truncate_rate:
+                self.truncated += 1
+                return True
+            return False
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/generate"
+
+
+def start_fake_server(port: int = 0, **options) -> FakeLLMServer:
+    """別スレッドで偽サーバーを起動して返す（port=0 なら空いているポートを使う）。停止は shutdown()"""
+    server = FakeLLMServer(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="オフラインテスト用の偽LLMサーバーを起動します。")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="1リクエストあたりの応答遅延（秒）")
+    parser.add_argument("--throttle-rpm", type=int, default=0, help="直近60秒でこの数を超えたら429を返す（0で無制限）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="この確率で503を返す")
+    parser.add_argument("--body-kb", type=int, default=0, help="本文をこのキロバイト数程度まで伸ばす")
+    parser.add_argument("--chunk-chars", type=int, default=256, help="ストリーミング時の1イベントあたりの文字数")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="ストリーミング時のイベント間の遅延（秒）")
+    parser.add_argument("--reject-rate", type=float, default=0.0, help="この確率で400（再試行しない失敗）を返す")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="この確率でストリーミングを途中で打ち切る")
+    parser.add_argument("--seed", type=int, default=None, help="エラー注入の乱数シード")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(("127.0.0.1", args.port), latency=args.latency, throttle_rpm=args.throttle_rpm,
+                           error_rate=args.error_rate, seed=args.seed, verbose=True, body_kb=args.body_kb,
+                           chunk_chars=args.chunk_chars, chunk_delay=args.chunk_delay, truncate_rate=args.truncate_rate,
+                           reject_rate=args.reject_rate)
+    print(f"偽LLMサーバーを起動しました: {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Atomフィードの生成
+# 言語ごとのフィード（docs/<言語>/feed.xml）とサイト全体のフィード（docs/feed.xml）に、
+# Front Matterの日付が新しい記事から FEED_ENTRIES 件を載せる。概要には記事の description を使う。
+
+import datetime
+import heapq
+import uuid
+from urllib.parse import quote
+from xml.sax.saxutils import escape, quoteattr
+
+from sitemap import absolute_url
+
+FEED_ENTRIES = 20
+FEED_TITLE = "IT学習ブログ"
+FEED_FILENAME = "feed.xml"
+# 出力の形式を変えたら上げる（載せる記事が前回と同じでもフィードを作り直させる）
+FEED_VERSION = 1
+ATOM_NS = "http://www.w3.org/2005/Atom"
+# 記事が1件もないフィードの <updated>
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def latest_articles(articles, count: int = FEED_ENTRIES) -> list:
+    """日付のある記事を新しい順に count 件返す（同じ日付なら言語・slugの降順）。日付のない記事は載せない"""
+    return heapq.nlargest(count, (article for article in articles if article.date),
+                          key=lambda article: (article.date, article.language_slug, article.slug))
+
+
+def article_path(article) -> str:
+    return f"/{article.language_slug}/{article.slug}.html"
+
+
+def atom_id(path: str) -> str:
+    """URLのパスから作るID。公開URLを設定・変更しても変わらないため、購読側で既読の記事が新着に戻らない"""
+    return uuid.uuid5(uuid.NAMESPACE_URL, path).urn
+
+
+def atom_timestamp(date: datetime.date) -> str:
+    return f"{date.isoformat()}T00:00:00Z"
+
+
+def atom_feed(title: str, feed_path: str, page_path: str, articles: list, site_url: str = None) -> str:
+    """articles（新しい順）を載せたAtomフィード
+
+    site_url（公開URL）がなければ、リンクはサイト内の絶対パスにする。
+    <updated> は最も新しい記事の日付にし、載せる記事が同じならビルドのたびに同じ内容になるようにする。
+    """
+    def link(path):
+        return quoteattr(absolute_url(site_url, path) if site_url else quote(path))
+
+    updated = articles[0].date if articles else EPOCH
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<feed xmlns="{ATOM_NS}" xml:lang="ja">',
+        f"<title>{escape(title)}</title>",
+        f'<link rel="self" type="application/atom+xml" href={link(feed_path)}/>',
+        f'<link rel="alternate" type="text/html" href={link(page_path)}/>',
+        f"<id>{atom_id(feed_path)}</id>",
+        f"<updated>{atom_timestamp(updated)}</updated>",
+        f"<author><name>{escape(FEED_TITLE)}</name></author>",
+    ]
+    for article in articles:
+        path = article_path(article)
+        lines += [
+            "<entry>",
+            f"<title>{escape(article.title)}</title>",
+            f'<link rel="alternate" type="text/html" href={link(path)}/>',
+            f"<id>{atom_id(path)}</id>",
+            f"<published>{atom_timestamp(article.date)}</published>",
+            f"<updated>{atom_timestamp(article.date)}</updated>",
+        ]
+        if article.description:
+            lines.append(f"<summary>{escape(article.description)}</summary>")
+        lines += [f"<category term={quoteattr(tag)}/>" for tag in article.tags]
+        lines.append("</entry>")
+    lines.append("</feed>")
+    return "\n".join(lines) + "\n"
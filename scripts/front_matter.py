@@ -0,0 +1,182 @@
+# 記事のFront Matter（先頭の --- で囲まれたブロック）の読み取り
+
+import datetime
+import re
+import sys
+from pathlib import Path
+
+try:
+    import yaml
+except ImportError:  # PyYAMLは任意。なければ単純な形式だけを解釈する
+    yaml = None
+
+FENCE = "---"
+DESCRIPTION_LENGTH = 150
+
+# generate_articles.py が出力する `key: value` / `key: [a, b]` 形式だけを扱う高速パス用
+SIMPLE_LINE_RE = re.compile(r"^([A-Za-z_][\w-]*):[ \t]*(.*?)[ \t]*$")
+SIMPLE_LIST_RE = re.compile(r"^\[([^\[\]{}\"']*)\]$")
+DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+# 値がこれらで始まる、またはこれらを含む場合はYAMLとして解釈する必要がある
+YAML_INDICATORS = tuple("[]{}\"'&*!|>%@`")
+LIST_FIELDS = ("tags", "categories")
+
+
+if yaml is not None:
+    class FrontMatterLoader(yaml.SafeLoader):
+        """存在しない日付（2025-02-30 など）を例外にせず文字列のまま返す SafeLoader"""
+
+        def construct_yaml_timestamp(self, node):
+            try:
+                return super().construct_yaml_timestamp(node)
+            except ValueError:
+                return self.construct_scalar(node)
+
+    FrontMatterLoader.add_constructor("tag:yaml.org,2002:timestamp", FrontMatterLoader.construct_yaml_timestamp)
+
+
+def split_front_matter(mdtext: str):
+    """記事全体の文字列を (Front Matterの中身 or None, 本文) に分ける"""
+    if not mdtext.startswith(FENCE + "\n"):
+        return None, mdtext
+    start = len(FENCE) + 1
+    pos = start
+    while True:
+        end = mdtext.find("\n", pos)
+        line = mdtext[pos:] if end == -1 else mdtext[pos:end]
+        if line.rstrip("\r") == FENCE:
+            return mdtext[start:pos], ("" if end == -1 else mdtext[end + 1:])
+        if end == -1:
+            return None, mdtext  # 閉じの --- がない
+        pos = end + 1
+
+
+def parse_front_matter(fm_text, source=None) -> dict:
+    """Front Matterの中身を型付きのdictにする
+
+    title / description は文字列、tags / categories はリスト、date は datetime.date（解釈できなければ None）になる。
+    フラットな `key: value` と `key: [a, b]` だけで書かれていれば自前で解釈し、
+    それ以外の書き方（複数行のリスト、引用符など）が含まれる場合だけYAMLパーサーを使う。
+    source（記事のパス）は警告の表示に使う。
+    """
+    fields = _parse_simple(fm_text or "")
+    if fields is None:
+        fields = _parse_yaml(fm_text)
+    meta = {"title": "", "description": "", "date": None, "categories": [], "tags": []}
+    for key, value in fields.items():
+        meta[key] = _normalize(key, value, source)
+    return meta
+
+
+def _parse_simple(fm_text: str):
+    """単純な形式だけで書かれていれば dict を、そうでなければ None を返す"""
+    fields = {}
+    for line in fm_text.splitlines():
+        if not line.strip() or line.startswith("#"):
+            continue
+        m = SIMPLE_LINE_RE.match(line)
+        if not m:
+            return None
+        key, value = m.groups()
+        if value.startswith("["):
+            items = SIMPLE_LIST_RE.match(value)
+            if not items:
+                return None
+            fields[key] = [item.strip() for item in items.group(1).split(",") if item.strip()]
+        elif value.startswith(YAML_INDICATORS) or ": " in value or " #" in value:
+            return None
+        else:
+            # 日付の文字列も _normalize() で datetime.date にする
+            fields[key] = value
+    return fields
+
+
+def _parse_yaml(fm_text: str) -> dict:
+    if yaml is not None:
+        try:
+            fields = yaml.load(fm_text, Loader=FrontMatterLoader)
+        except (yaml.YAMLError, ValueError):
+            fields = None
+        if isinstance(fields, dict):
+            return {str(key): value for key, value in fields.items()}
+    # YAMLとして読めない（またはPyYAMLがない）場合は、`key: value` の行を1行ずつ拾う
+    fields = {}
+    for line in fm_text.splitlines():
+        if not line.strip() or line.startswith("#"):
+            continue
+        m = SIMPLE_LINE_RE.match(line)
+        if not m:
+            continue
+        key, value = m.groups()
+        items = SIMPLE_LIST_RE.match(value)
+        if items:
+            fields[key] = [item.strip() for item in items.group(1).split(",") if item.strip()]
+        else:
+            # `title: Python入門: 基本` のように値に ": " を含む行も、最初の ": " より後ろをそのまま値にする
+            fields[key] = value
+    return fields
+
+
+def _normalize(key: str, value, source=None):
+    if key in LIST_FIELDS:
+        if value is None or value == "":
+            return []
+        if not isinstance(value, list):
+            value = [value]
+        return [str(item) for item in value]
+    if key == "date":
+        if isinstance(value, datetime.datetime):
+            return value.date()
+        if isinstance(value, datetime.date):
+            return value
+        if isinstance(value, str) and DATE_RE.match(value):
+            try:
+                return datetime.date.fromisoformat(value)
+            except ValueError:
+                print(f"警告: {source or 'Front Matter'}: date の {value} は存在しない日付のため無視します。", file=sys.stderr)
+        return None
+    if key in ("title", "description"):
+        return "" if value is None else str(value)
+    return value
+
+
+def summarize(first_paragraph: str) -> str:
+    """description がない記事のために、本文の最初の段落から概要文を作る"""
+    return (first_paragraph[:DESCRIPTION_LENGTH] + '...') if len(first_paragraph) > DESCRIPTION_LENGTH else first_paragraph
+
+
+def read_front_matter(path: Path):
+    """ファイルを先頭から1行ずつ読み、(Front Matterの中身 or None, 本文の最初の段落) を返す
+
+    閉じの --- と、description の補完に必要な最初の段落までしか読まないため、
+    インデックスの生成だけなら記事本文のサイズに関係なく高速に終わる。
+    """
+    with open(path, encoding="utf-8") as f:
+        fm_lines = None
+        first = f.readline()
+        if first.rstrip("\r\n") == FENCE and first.endswith("\n"):
+            fm_lines = []
+            for line in f:
+                if line.rstrip("\r\n") == FENCE:
+                    break
+                fm_lines.append(line)
+            else:
+                # 閉じの --- がなければFront Matterなしとして先頭から読み直す
+                fm_lines = None
+                f.seek(0)
+        else:
+            f.seek(0)
+
+        # 本文先頭の空白行を読み飛ばし、空行（"\n\n"）までを最初の段落とする
+        paragraph = []
+        for line in f:
+            if not paragraph and not line.strip():
+                continue
+            if paragraph and line == "\n":
+                return _join_fm(fm_lines), "".join(paragraph).lstrip()[:-1]
+            paragraph.append(line)
+        return _join_fm(fm_lines), "".join(paragraph).strip()
+
+
+def _join_fm(fm_lines):
+    return None if fm_lines is None else "".join(fm_lines)
@@ -0,0 +1,150 @@
+# ディレクトリの変更監視（開発サーバー用）
+# Linuxではinotifyを使い、使えない環境ではmtimeのポーリングで代用する
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+
+# <sys/inotify.h> の定数
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+# 保存時にエディタが作る一時ファイルは無視する
+IGNORED_SUFFIXES = ("~", ".swp", ".swx", ".tmp")
+# 1回の保存で複数のイベントが続けて届くため、最初のイベントからこの秒数だけ待ってまとめる
+DEBOUNCE_SECONDS = 0.02
+
+
+def is_ignored(path: Path) -> bool:
+    return path.name.startswith((".", "#")) or path.name.endswith(IGNORED_SUFFIXES)
+
+
+class InotifyWatcher:
+    """inotifyで roots 以下のディレクトリを（サブディレクトリも含めて）監視する"""
+
+    def __init__(self, roots):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc が見つかりません")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify を利用できません")
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 に失敗しました")
+        self._dirs = {}  # watch descriptor -> ディレクトリ
+        for root in roots:
+            for dirpath, dirnames, _ in os.walk(root):
+                dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+                self._add_watch(Path(dirpath))
+
+    def _add_watch(self, directory: Path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"{directory} を監視できません")
+        self._dirs[wd] = directory
+
+    def wait(self, timeout: float = None) -> set:
+        """変更があるまで最大 timeout 秒待ち、変更されたファイルのパスの集合を返す（なければ空集合）"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed = set()
+        deadline = time.monotonic() + DEBOUNCE_SECONDS
+        while True:
+            self._read_events(changed)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([self._fd], [], [], remaining)[0]:
+                return changed
+
+    def _read_events(self, changed: set):
+        try:
+            data = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                if mask & IN_DELETE_SELF:
+                    self._dirs.pop(wd, None)
+                continue
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not path.name.startswith("."):
+                    self._add_watch(path)  # 新しい言語ディレクトリなど
+                    changed.update(p for p in path.rglob("*") if p.is_file() and not is_ignored(p))
+                continue
+            if not is_ignored(path):
+                changed.add(path)
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """一定間隔で roots 以下の全ファイルの mtime とサイズを比べる（inotifyが使えない環境用）"""
+
+    def __init__(self, roots, interval: float = 0.5):
+        self.roots = [Path(root) for root in roots]
+        self.interval = interval
+        self._state = self._scan()
+
+    def _scan(self) -> dict:
+        state = {}
+        for root in self.roots:
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+                for filename in filenames:
+                    path = Path(dirpath) / filename
+                    if is_ignored(path):
+                        continue
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    state[path] = (st.st_mtime_ns, st.st_size)
+        return state
+
+    def wait(self, timeout: float = None) -> set:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            state = self._scan()
+            changed = {path for path in state.keys() | self._state.keys() if state.get(path) != self._state.get(path)}
+            self._state = state
+            if changed:
+                return changed
+            remaining = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            if remaining <= 0:
+                return set()
+            time.sleep(remaining)
+
+    def close(self):
+        pass
+
+
+def create_watcher(roots, polling: bool = False):
+    """inotifyの監視を作る。polling=True の場合や、inotifyが使えない場合はポーリングにする"""
+    if not polling:
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(roots)
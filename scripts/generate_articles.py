@@ -1,32 +1,47 @@
 
 import os
+import argparse
+import asyncio
 import datetime
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import subprocess
 import json
 import sys
 from article_topics import TOPICS
+from front_matter import parse_front_matter, read_front_matter, split_front_matter
+from llm_backends import BACKENDS, create_backend
+from response_cache import ResponseCache, make_key
+from rate_limit import RequestScheduler
+from streaming_writer import ArticleComposer, StreamingFile
+from generation_journal import JOURNAL_NAME, STATUS_DONE, STATUS_FAILED, STATUS_STUB, GenerationJournal, content_hash, file_hash
 
 ARTICLES_DIR = Path("articles")
 PROMPT_PATH = Path("roadmap/gemini-prompt.md")
+DEFAULT_CONCURRENCY = 4
 
-# call_gemini_api 関数は削除されます。
-
-def generate_and_save_article(language: str, date: str, theme: str, index: int):
-    """空のMarkdownファイル（フロントマターのみ）を生成し保存"""
-    # ファイル名を「01_テーマ名.md」のように整形
+def article_filename(language: str, theme: str, index: int, articles_dir: Path = ARTICLES_DIR) -> Path:
+    """ファイル名を「01_テーマ名.md」のように整形"""
     safe_theme = "".join(c if c.isalnum() or c in ['-', '_'] else '_' for c in theme)
     safe_theme = '_'.join(filter(None, safe_theme.split('_')))
-    filename = ARTICLES_DIR / language.lower() / f"{index:02d}_{safe_theme}.md"
+    return articles_dir / language.lower() / f"{index:02d}_{safe_theme}.md"
 
-    # YAMLフロントマターのみを含むコンテンツを作成
-    content = f"""---
+def make_front_matter(language: str, date: str, theme: str, description: str = "") -> str:
+    """記事のYAMLフロントマターを作成"""
+    description_line = f"description: {description}\n" if description else ""
+    return f"""---
 title: {language}の{theme}入門
 date: {date}
 categories: [{language}]
 tags: [AI, Gemini, 自動生成, {language}, {theme}]
----
+{description_line}---
+"""
 
+def stub_content(language: str, date: str, theme: str, filename: Path) -> str:
+    """空のMarkdownファイル（フロントマターと生成手順のみ）の内容"""
+    return make_front_matter(language, date, theme) + f"""
 # 記事本文をここに記述してください
 
 ## Gemini CLIでの生成方法
@@ -41,38 +56,278 @@ tags: [AI, Gemini, 自動生成, {language}, {theme}]
 # rm temp_output.json
 ```
 """
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(content)
+
+def generate_and_save_article(language: str, date: str, theme: str, index: int, articles_dir: Path = ARTICLES_DIR, journal: GenerationJournal = None):
+    """空のMarkdownファイル（フロントマターのみ）を生成し保存"""
+    filename = article_filename(language, theme, index, articles_dir)
+    content = stub_content(language, date, theme, filename)
+    write_article(filename, content, theme, journal, STATUS_STUB, index=index, date=date)
     print(f"空の記事ファイル「{filename}」を生成しました。")
 
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python generate_articles.py <language>")
-        sys.exit(1)
+def archive_file(path: Path, archive_dir: Path):
+    """path を archive_dir へ移す
+
+    同じ内容のファイルがすでにアーカイブにあれば移さずに削除し、
+    同名で内容の違うファイルがあれば名前に日時を付けて重複させない。
+    """
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    digest = file_hash(path)
+    if any(file_hash(archived) == digest for archived in archive_dir.glob("*.md")):
+        path.unlink()
+        return None
+    target = archive_dir / path.name
+    if target.exists():
+        target = archive_dir / f"{path.stem}.{datetime.datetime.now():%Y%m%d%H%M%S}{path.suffix}"
+    path.rename(target)
+    return target
+
+def commit_article(out: StreamingFile, theme: str, journal: GenerationJournal = None, status: str = STATUS_DONE, **fields):
+    """書き終えた一時ファイルで記事ファイルを置き換え、ジャーナルに記録する
+
+    置き換えられる既存のファイルは、ジャーナルが書いたままの空の記事でなければアーカイブする。
+    """
+    out.close()
+    filename = out.path
+    if filename.exists() and file_hash(filename) != out.digest:
+        if journal is None or not journal.is_untouched_stub(theme, filename):
+            archived = archive_file(filename, filename.parent / "archive")
+            if archived is not None:
+                print(f"  - {filename.name} をアーカイブしました。")
+    out.commit()
+    if journal is not None:
+        journal.record(theme, status, file=filename.name, hash=out.digest, **fields)
+
+def write_article(filename: Path, content: str, theme: str, journal: GenerationJournal = None, status: str = STATUS_DONE, **fields):
+    """記事ファイルを（一時ファイル経由で）書き、ジャーナルに記録する"""
+    out = StreamingFile(filename)
+    try:
+        out.write(content)
+    except BaseException:
+        out.discard()
+        raise
+    commit_article(out, theme, journal, status, **fields)
+
+
+def render_prompt(template: str, language: str, date: str, theme: str) -> str:
+    """roadmap/gemini-prompt.md のプレースホルダーを埋める"""
+    return template.replace("{language}", language).replace("{theme}", theme).replace("{date}", date)
+
+def compose_article(language: str, date: str, theme: str, response: str) -> str:
+    """モデルの応答から記事ファイルの内容を作る
+
+    プロンプトはFront Matter付きの出力を求めているため、応答にFront Matterがあれば本文だけを使い、
+    description だけを引き継ぐ。title や tags は常にこちらで決めた値にする。
+    """
+    fm_text, body = split_front_matter(response.lstrip())
+    description = parse_front_matter(fm_text)["description"] if fm_text is not None else ""
+    return make_front_matter(language, date, theme, description) + "\n" + body.strip() + "\n"
+
+async def stream_article(chunks, out: StreamingFile, composer: ArticleComposer, cache_writer=None):
+    """応答の断片を届いた順に記事ファイル（一時ファイル）と応答キャッシュへ書き込む"""
+    async for chunk in chunks:
+        if cache_writer is not None:
+            cache_writer.write(chunk)
+        out.write(composer.feed(chunk))
+    out.write(composer.close())
+
+async def fill_article(backend, scheduler: RequestScheduler, semaphore: asyncio.Semaphore, prompt_template: str, language: str, date: str, theme: str, index: int, articles_dir: Path, cache: ResponseCache = None, refresh: bool = False, journal: GenerationJournal = None, stream: bool = False, first_writes: list = None) -> Path:
+    prompt = render_prompt(prompt_template, language, date, theme)
+    # プロンプト・モデル・バックエンドが同じなら前回の応答を使い回す。
+    # 日付は記事ごと・実行日ごとに変わるが、Front Matterの date は compose_article() で書き直すため、
+    # キーには日付を埋めないプロンプトを使う（別の日に実行しても同じトピックの応答を使い回せる）
+    key = make_key(render_prompt(prompt_template, language, "{date}", theme), backend.model, {"backend": backend.name})
+    response = cache.get(key) if cache is not None and not refresh else None
+    filename = article_filename(language, theme, index, articles_dir)
+    fields = {"index": index, "date": date, "backend": backend.name, "model": backend.model}
+    if response is not None:
+        write_article(filename, compose_article(language, date, theme, response), theme, journal, STATUS_DONE, **fields)
+        return filename
+    out = cache_writer = None
+    try:
+        async with semaphore:
+            if stream:
+                # 応答全体を待たずに、届いた断片から一時ファイルへ書き込む
+                out = StreamingFile(filename)
+                cache_writer = cache.open(key, language=language, theme=theme, model=backend.model, backend=backend.name) if cache is not None else None
+                composer = ArticleComposer(lambda description: make_front_matter(language, date, theme, description))
+                await stream_article(await scheduler.stream(backend, prompt), out, composer, cache_writer)
+            else:
+                response = await scheduler.call(backend, prompt)
+    except BaseException as e:
+        # 途中で途切れた応答は記事にもキャッシュにも残さない
+        if out is not None:
+            out.discard()
+        if cache_writer is not None:
+            cache_writer.discard()
+        if journal is not None and isinstance(e, Exception):
+            journal.record(theme, STATUS_FAILED, error=str(e), **fields)
+        raise
+    if stream:
+        if cache_writer is not None:
+            cache_writer.commit()
+        if first_writes is not None and out.first_write is not None:
+            first_writes.append(out.first_write)
+        commit_article(out, theme, journal, STATUS_DONE, **fields)
+        return filename
+    # 応答はすぐキャッシュに保存するため、途中で中断しても再実行時に同じトピックへ再リクエストしない
+    if cache is not None:
+        cache.put(key, response, language=language, theme=theme, model=backend.model, backend=backend.name)
+    write_article(filename, compose_article(language, date, theme, response), theme, journal, STATUS_DONE, **fields)
+    return filename
 
-    target_language = sys.argv[1]
+async def fill_articles(language: str, topics: list, backend, concurrency: int = DEFAULT_CONCURRENCY, articles_dir: Path = ARTICLES_DIR, cache: ResponseCache = None, refresh=(), scheduler: RequestScheduler = None, journal: GenerationJournal = None, stream: bool = False) -> dict:
+    """各トピックの記事本文をバックエンドで生成して保存する
+
+    topics は (番号, テーマ, 日付) のリスト。リクエストは同時に concurrency 件まで並行して投げる。
+    1件の失敗で他のトピックは止めず、失敗したトピックは結果の failed に (テーマ, 例外) として入る。
+    cache を渡すと、プロンプトが変わっていないトピックはキャッシュした応答を使う。
+    refresh に含まれるテーマはキャッシュを無視して生成し直す。
+    scheduler でレート制限と429/5xxのリトライ方針を指定する（省略時はレート制限なし）。
+    journal を渡すと、各トピックの結果（done / failed）を記録する。
+    stream が真なら応答をストリーミングで受け取り、届いた断片から記事ファイルに書き込む
+    （結果の first_write はリクエスト開始から最初の書き込みまでの秒数の中央値）。
+    """
+    if scheduler is None:
+        scheduler = RequestScheduler()
+    with open(PROMPT_PATH, encoding="utf-8") as f:
+        prompt_template = f.read()
+    (articles_dir / language.lower()).mkdir(parents=True, exist_ok=True)
+    semaphore = asyncio.Semaphore(concurrency)
+    # HTTPBackend などブロッキングI/Oをスレッドで回すバックエンドが同時実行数まで並行できるようにする
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+
+    first_writes = []
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(fill_article(backend, scheduler, semaphore, prompt_template, language, date, theme, index, articles_dir, cache, theme in refresh, journal, stream, first_writes)
+          for index, theme, date in topics),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - start
+    failed = [(theme, result) for (_, theme, _), result in zip(topics, results) if isinstance(result, BaseException)]
+    return {"topics": len(topics), "failed": failed, "elapsed": elapsed, "cached": cache.hits if cache is not None else 0, "retries": scheduler.retries,
+            "first_write": statistics.median(first_writes) if first_writes else None}
+
+def adopt_existing(language: str, topics: list, journal: GenerationJournal, articles_dir: Path = ARTICLES_DIR):
+    """ジャーナルに記録のない既存の記事ファイルを記録する
+
+    ジャーナル導入前に作られたファイルや手で書いたファイルを、書き直さずに済むようにする。
+    生成したままの空の記事と同じ内容なら stub、それ以外（本文を追記したもの）は done とする。
+    """
+    for i, theme in enumerate(topics):
+        filename = article_filename(language, theme, i + 1, articles_dir)
+        if journal.latest(theme) is not None or not filename.exists():
+            continue
+        fm_text, _ = read_front_matter(filename)
+        date = parse_front_matter(fm_text, filename)["date"] if fm_text is not None else None
+        date = date.isoformat() if isinstance(date, datetime.date) else str(date or datetime.date.today().isoformat())
+        digest = file_hash(filename)
+        status = STATUS_STUB if digest == content_hash(stub_content(language, date, theme, filename).encode("utf-8")) else STATUS_DONE
+        journal.record(theme, status, index=i + 1, file=filename.name, hash=digest, date=date, adopted=True)
+
+def pending_topics(language: str, topics: list, journal: GenerationJournal, statuses: tuple, refresh=(), articles_dir: Path = ARTICLES_DIR) -> list:
+    """まだ生成が必要なトピックを (番号, テーマ, 日付) のリストで返す
+
+    ジャーナルの最新の状態が statuses のいずれかで、記録したファイルが残っているトピックは飛ばす。
+    日付は前回記録したものを引き継ぐ（プロンプトが変わらないので応答キャッシュも効く）。
+    """
+    today = datetime.date.today().isoformat()
+    pending = []
+    for i, theme in enumerate(topics):
+        entry = journal.latest(theme)
+        filename = article_filename(language, theme, i + 1, articles_dir)
+        if entry is not None and entry["status"] in statuses and filename.exists() and theme not in refresh:
+            continue
+        pending.append((i + 1, theme, entry.get("date", today) if entry is not None else today))
+    return pending
+
+def archive_orphans(language: str, topics: list, articles_dir: Path = ARTICLES_DIR):
+    """TOPICS に対応しなくなった記事ファイル（テーマ名や番号が変わったもの）をアーカイブする"""
+    lang_dir = articles_dir / language.lower()
+    expected = {article_filename(language, theme, i + 1, articles_dir).name for i, theme in enumerate(topics)}
+    for f in sorted(lang_dir.glob("*.md")):
+        if f.name != "index.md" and f.name not in expected: # index.md はアーカイブしない
+            archive_file(f, lang_dir / "archive")
+            print(f"  - {f.name} をアーカイブしました。")
+
+def print_fill_report(report: dict):
+    succeeded = report["topics"] - len(report["failed"])
+    throughput = succeeded / report["elapsed"] if report["elapsed"] else 0.0
+    print(f"{succeeded}/{report['topics']} 件を {report['elapsed']:.2f} 秒で生成しました（{throughput:.2f} 件/秒、うちキャッシュ利用 {report['cached']} 件、リトライ {report['retries']} 回）。")
+    if report.get("first_write") is not None:
+        print(f"  最初の書き込みまで（中央値）: {report['first_write'] * 1000:.0f} ms")
+    for topic, error in report["failed"]:
+        print(f"  - 失敗: {topic}: {error}")
+
+def backend_options(args) -> dict:
+    options = {}
+    if args.model:
+        options["model"] = args.model
+    if args.backend == "http":
+        if not args.url:
+            print("Error: --backend http には --url が必要です。")
+            sys.exit(1)
+        options["url"] = args.url
+    return options
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="学習ロードマップの記事ファイルを生成します。")
+    parser.add_argument("language", help="article_topics.py の TOPICS にある言語名（例: Python）")
+    parser.add_argument("--fill", action="store_true", help="LLMバックエンドで記事本文まで生成する")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="gemini", help="--fill で使うバックエンド（stub はオフライン用）")
+    parser.add_argument("--model", default="", help="バックエンドに渡すモデル名")
+    parser.add_argument("--url", default="", help="--backend http のエンドポイントURL")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="同時に投げるリクエスト数の上限")
+    parser.add_argument("--rpm", type=float, default=None, help="1分あたりのリクエスト数の上限")
+    parser.add_argument("--tpm", type=float, default=None, help="1分あたりのトークン数の上限（1文字≒1トークンで見積もる）")
+    parser.add_argument("--max-retries", type=int, default=5, help="429/5xx・接続失敗時の最大リトライ回数")
+    parser.add_argument("--backoff-base", type=float, default=1.0, help="指数バックオフの初期待ち時間（秒）")
+    parser.add_argument("--no-cache", dest="cache", action="store_false", help="応答キャッシュを使わない")
+    parser.add_argument("--no-stream", dest="stream", action="store_false", help="ストリーミングを使わず応答全体を待ってから書き込む")
+    parser.add_argument("--refresh", action="append", default=[], metavar="THEME", help="キャッシュを無視して生成し直すテーマ（複数指定可）")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    target_language = args.language
     if target_language not in TOPICS:
         print(f"Error: Language '{target_language}' not found in TOPICS.")
         sys.exit(1)
 
-    today = datetime.date.today().isoformat()
+    topics = TOPICS[target_language]
     lang_dir = ARTICLES_DIR / target_language.lower()
-    archive_dir = lang_dir / "archive"
     lang_dir.mkdir(parents=True, exist_ok=True)
-    archive_dir.mkdir(exist_ok=True)
+    journal = GenerationJournal(lang_dir / JOURNAL_NAME)
+    adopt_existing(target_language, topics, journal)
+    archive_orphans(target_language, topics)
 
-    # 既存のMarkdownファイルをアーカイブ
-    print(f"既存の {target_language} 記事をアーカイブしています...")
-    for f in lang_dir.glob("*.md"):
-        if f.name != "index.md": # index.md はアーカイブしない
-            f.rename(archive_dir / f.name)
-            print(f"  - {f.name} をアーカイブしました。")
-    print("アーカイブ完了。\n")
+    if args.fill:
+        backend = create_backend(args.backend, **backend_options(args))
+        unknown = [theme for theme in args.refresh if theme not in topics]
+        if unknown:
+            print(f"Error: --refresh のテーマが TOPICS にありません: {', '.join(unknown)}")
+            sys.exit(1)
+        # 本文まで生成済みのトピックは飛ばす
+        pending = pending_topics(target_language, topics, journal, (STATUS_DONE,), set(args.refresh))
+        print(f"{target_language} の記事本文を {args.backend} バックエンドで生成しています（{len(pending)} 件、生成済み {len(topics) - len(pending)} 件はスキップ、同時実行数 {args.concurrency}）...")
+        cache = ResponseCache() if args.cache else None
+        scheduler = RequestScheduler(args.rpm, args.tpm, max_retries=args.max_retries, backoff_base=args.backoff_base)
+        report = asyncio.run(fill_articles(target_language, pending, backend, args.concurrency,
+                                           cache=cache, refresh=set(args.refresh), scheduler=scheduler, journal=journal,
+                                           stream=args.stream and hasattr(backend, "stream")))
+        print_fill_report(report)
+        print("\nすべての記事本文の生成が完了したら、以下のコマンドで静的サイトを構築できます。")
+        print("  python scripts/build_site.py")
+        if report["failed"]:
+            sys.exit(1)
+        return
 
-    print(f"{target_language} の記事ファイル（フロントマターのみ）を生成しています...")
-    for i, topic in enumerate(TOPICS[target_language]):
-        generate_and_save_article(target_language, today, topic, i + 1)
+    # 記事ファイルが残っているトピックは上書きしない（本文の生成に失敗したトピックも前回のファイルを残す）
+    pending = pending_topics(target_language, topics, journal, (STATUS_STUB, STATUS_DONE, STATUS_FAILED))
+    print(f"{target_language} の記事ファイル（フロントマターのみ）を生成しています（{len(pending)} 件、既存 {len(topics) - len(pending)} 件はスキップ）...")
+    for index, topic, date in pending:
+        generate_and_save_article(target_language, date, topic, index, journal=journal)
     print(f"\n{target_language} の記事ファイル生成完了。\n")
 
     print("--- 次のステップ ---")
@@ -0,0 +1,65 @@
+# 記事生成のジャーナル
+# トピックごとに「いつ・どの状態（stub / done / failed）で・どんな内容（ハッシュ）のファイルを書いたか」を
+# 追記専用のJSON Linesに記録する。再実行時はこれを見て完了済みのトピックを飛ばす。
+
+import datetime
+import hashlib
+import json
+from pathlib import Path
+
+JOURNAL_NAME = "generation_journal.jsonl"
+
+STATUS_STUB = "stub"      # Front Matterと手順だけの空の記事
+STATUS_DONE = "done"      # 本文まで生成済み
+STATUS_FAILED = "failed"  # 本文の生成に失敗
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path: Path) -> str:
+    with open(path, "rb") as f:
+        return content_hash(f.read())
+
+
+class GenerationJournal:
+    """トピック → 最新の記録 を保持する追記専用ジャーナル"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries = {}
+        self.written = {}  # トピック → ファイルを書いた最新の記録（failed の記録は hash を持たない）
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # 書き込み途中で中断された最終行は無視する
+                    self._add(entry)
+
+    def _add(self, entry: dict):
+        self.entries[entry["topic"]] = entry
+        if "hash" in entry:
+            self.written[entry["topic"]] = entry
+
+    def latest(self, topic: str):
+        return self.entries.get(topic)
+
+    def record(self, topic: str, status: str, **fields) -> dict:
+        entry = {"topic": topic, "status": status, "timestamp": datetime.datetime.now().isoformat(timespec="seconds")}
+        entry.update(fields)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._add(entry)
+        return entry
+
+    def is_untouched_stub(self, topic: str, path: Path) -> bool:
+        """path が、このジャーナルが書いたままの（手を加えられていない）空の記事か"""
+        entry = self.written.get(topic)
+        return (entry is not None and entry["status"] == STATUS_STUB and path.exists()
+                and entry.get("hash") == file_hash(path))
@@ -0,0 +1,156 @@
+# コードブロックのハイライト結果キャッシュ
+# (言語, コード, Pygmentsスタイル, フォーマッタ設定) のハッシュをキーに、ハイライト済みHTML断片を
+# ディスクに保存する。ビルドをまたいで同じコードブロックはPygmentsを通さずに済む。
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+import pygments
+from markdown.extensions import Extension
+from markdown.extensions.codehilite import CodeHilite, CodeHiliteExtension
+from markdown.extensions.fenced_code import FencedBlockPreprocessor
+
+from build_profile import timer
+
+
+def make_key(lang, code: str, style: str, options: dict) -> str:
+    # Pygmentsのバージョンが変わると出力も変わり得るのでキーに含める
+    payload = json.dumps([pygments.__version__, lang, code, style, options], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# プロセス内に保持するHTML断片の件数の上限（記事数が多くてもメモリが増え続けないようにする）
+MEMORY_ENTRIES = 1024
+
+
+class HighlightCache:
+    """キー → HTML断片 のコンテンツアドレス型ディスクキャッシュ（mtimeによるLRU）"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.memory = OrderedDict()  # 同一プロセス内で繰り返し出てくるブロック用（最近使った MEMORY_ENTRIES 件）
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, html: str):
+        self.memory[key] = html
+        self.memory.move_to_end(key)
+        if len(self.memory) > MEMORY_ENTRIES:
+            self.memory.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / (key + ".html")
+
+    def get(self, key: str):
+        html = self.memory.get(key)
+        if html is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return html
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                html = f.read()
+            os.utime(path)  # 最終利用時刻を更新（LRUの判定に使う）
+        except OSError:
+            self.misses += 1
+            return None
+        self._remember(key, html)
+        self.hits += 1
+        return html
+
+    def put(self, key: str, html: str):
+        self._remember(key, html)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 並列ワーカーが同じキーを書いても壊れないよう、一時ファイルからrenameする
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(html)
+        os.replace(tmp_path, path)
+
+    def evict(self, max_bytes: int) -> int:
+        """合計サイズが max_bytes 以下になるまで最終利用が古いものから削除し、削除件数を返す"""
+        if not self.directory.exists():
+            return 0
+        entries = []
+        total = 0
+        for sub in os.scandir(self.directory):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+
+class CachedFencedBlockPreprocessor(FencedBlockPreprocessor):
+    """属性指定のない単純なフェンス付きコードブロックを、キャッシュ経由でハイライトする
+
+    {attrs} や hl_lines を持つブロックはそのまま残し、後段の標準 fenced_code に任せる。
+    """
+
+    def __init__(self, md, cache: HighlightCache):
+        super().__init__(md, {})
+        self.cache = cache
+
+    def run(self, lines):
+        if not self.checked_for_deps:
+            for ext in self.md.registeredExtensions:
+                if isinstance(ext, CodeHiliteExtension):
+                    self.codehilite_conf = ext.getConfigs()
+            self.checked_for_deps = True
+        if not (self.codehilite_conf and self.codehilite_conf["use_pygments"]):
+            return lines
+
+        text = "\n".join(lines)
+        index = 0
+        while True:
+            m = self.FENCED_BLOCK_RE.search(text, index)
+            if not m:
+                break
+            if m.group("attrs") or m.group("hl_lines"):
+                index = m.end()
+                continue
+            placeholder = self.md.htmlStash.store(self.highlight(m.group("code"), m.group("lang") or None))
+            text = f"{text[:m.start()]}\n{placeholder}\n{text[m.end():]}"
+            index = m.start() + 1 + len(placeholder)
+        return text.split("\n")
+
+    def highlight(self, code: str, lang) -> str:
+        local_config = self.codehilite_conf.copy()
+        style = local_config.pop("pygments_style", "default")
+        with timer.phase("highlight"):
+            key = make_key(lang, code, style, local_config)
+            html = self.cache.get(key)
+            if html is None:
+                html = CodeHilite(code, lang=lang, style=style, **local_config).hilite(shebang=False)
+                self.cache.put(key, html)
+        return html
+
+
+class HighlightCacheExtension(Extension):
+    """fenced_code + codehilite のハイライト結果をディスクキャッシュするMarkdown拡張"""
+
+    def __init__(self, **kwargs):
+        self.config = {
+            "cache_dir": ["", "ハイライト結果を保存するディレクトリ"],
+        }
+        super().__init__(**kwargs)
+
+    def extendMarkdown(self, md):
+        md.registerExtension(self)
+        cache = HighlightCache(Path(self.getConfig("cache_dir")))
+        # 標準の fenced_code_block (優先度25) より先に実行する
+        md.preprocessors.register(CachedFencedBlockPreprocessor(md, cache), "fenced_code_cache", 26)
@@ -0,0 +1,204 @@
+# 記事本文生成に使うLLMバックエンド
+# generate_articles.py --fill から利用する。どのバックエンドも
+# `async def generate(prompt) -> str`（Markdownの記事本文を返す）を実装する。
+# ストリーミングに対応するバックエンドは、本文の断片を順に返す非同期イテレーターを作る
+# `async def stream(prompt)` も実装する（接続とステータスの確認まで済ませてから返す）。
+
+import asyncio
+import hashlib
+import json
+import re
+import urllib.error
+import urllib.request
+
+STREAM_CHUNK_CHARS = 256  # スタブが本文を分割して返すときの1断片の文字数
+STREAM_READ_BYTES = 1 << 16  # ストリーミング応答を1回に読む最大バイト数
+# Gemini CLI の失敗メッセージのうち、時間をおけば成功し得るもの（レート制限・クォータ・サーバーエラー）。
+# ステータスは "status: 429"・"code":503・HTTP 500 のように書かれた数字だけを拾う（行番号などは拾わない）
+CLI_STATUS_RE = re.compile(r"(?:\bstatus|\bcode|\bHTTP)[\"']?\s*[:=]?\s*[\"']?(429|5\d\d)\b", re.I)
+CLI_RETRYABLE_RE = re.compile(r"quota|rate.?limit|RESOURCE_EXHAUSTED|UNAVAILABLE|overloaded", re.I)
+
+
+class BackendError(Exception):
+    """バックエンド呼び出しの失敗
+
+    status はHTTPステータス（分かる場合）。retryable が真なら、時間をおけば成功し得る
+    一時的な失敗（レート制限・サーバーエラー・接続失敗）を表す。
+    """
+
+    def __init__(self, message: str, status: int = None, retryable: bool = False, retry_after: float = None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class GeminiCLIBackend:
+    """Gemini CLI（`gemini -o json`）をサブプロセスとして呼び出す"""
+
+    name = "gemini"
+
+    def __init__(self, model: str = "", command: str = "gemini"):
+        self.model = model
+        self.command = command
+
+    async def generate(self, prompt: str) -> str:
+        args = [self.command, "-o", "json", "--yolo"]
+        if self.model:
+            args += ["-m", self.model]
+        proc = await asyncio.create_subprocess_exec(
+            *args, prompt, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await proc.communicate()
+        if proc.returncode != 0:
+            # エラーの詳細は stderr か、-o json なら stdout のJSONに出る
+            message = (stderr.decode(errors="replace") + "\n" + stdout.decode(errors="replace")).strip()
+            status = CLI_STATUS_RE.search(message)
+            raise BackendError(f"{self.command} が終了コード {proc.returncode} で失敗しました: {message}",
+                               status=int(status.group(1)) if status else None,
+                               retryable=status is not None or CLI_RETRYABLE_RE.search(message) is not None)
+        # プロンプトはFront Matter付きのMarkdownを求めているため、.response をそのまま本文として返す
+        # （Front Matterの扱いは generate_articles.compose_article に任せる）
+        try:
+            response = json.loads(stdout)["response"]
+        except (ValueError, KeyError, TypeError) as e:
+            raise BackendError(f"{self.command} の出力を解釈できません: {e}")
+        if not isinstance(response, str):
+            raise BackendError(f"{self.command} の出力の response が文字列ではありません")
+        return response
+
+
+class HTTPBackend:
+    """JSONをPOSTして {"article_body": "..."} を受け取るHTTPエンドポイント
+
+    "stream": true を付けるとServer-Sent Eventsで本文を断片ごとに受け取る（stream()）。
+    fake_llm_server.py もこの形式に従う。
+    """
+
+    name = "http"
+
+    def __init__(self, url: str, model: str = "", timeout: float = 300):
+        self.url = url
+        self.model = model
+        self.timeout = timeout
+
+    def _open(self, payload: dict, accept: str):
+        body = json.dumps(payload).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json", "Accept": accept})
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            raise BackendError(f"{self.url} が HTTP {e.code} を返しました", status=e.code,
+                               retryable=e.code == 429 or e.code >= 500, retry_after=_retry_after(e.headers))
+        except (urllib.error.URLError, OSError) as e:
+            raise BackendError(f"{self.url} に接続できません: {e}", retryable=True)
+
+    def _read_json(self, response) -> str:
+        try:
+            with response:
+                return json.load(response)["article_body"]
+        except OSError as e:
+            raise BackendError(f"{self.url} からの受信に失敗しました: {e}", retryable=True)
+        except (ValueError, KeyError) as e:
+            raise BackendError(f"{self.url} の応答を解釈できません: {e}")
+
+    def _post(self, prompt: str) -> str:
+        return self._read_json(self._open({"model": self.model, "prompt": prompt}, "application/json"))
+
+    async def generate(self, prompt: str) -> str:
+        return await asyncio.to_thread(self._post, prompt)
+
+    async def stream(self, prompt: str):
+        """Server-Sent Events（`data: {"delta": "..."}` の行、最後に `data: [DONE]`）で本文を受け取る
+
+        サーバーがストリーミングに対応せず普通のJSONを返した場合は、本文全体を1断片として返す。
+        """
+        response = await asyncio.to_thread(self._open, {"model": self.model, "prompt": prompt, "stream": True}, "text/event-stream")
+        if not response.headers.get("Content-Type", "").startswith("text/event-stream"):
+            body = await asyncio.to_thread(self._read_json, response)
+            return _single_chunk(body)
+        return self._iter_events(response)
+
+    async def _iter_events(self, response):
+        buffer = b""
+        with response:
+            while True:
+                # 1行ごとにスレッドを往復すると遅いため、届いている分をまとめて読む
+                try:
+                    data = await asyncio.to_thread(response.read1, STREAM_READ_BYTES)
+                except OSError as e:
+                    raise BackendError(f"{self.url} からの受信に失敗しました: {e}")
+                if not data:
+                    raise BackendError(f"{self.url} のストリームが [DONE] の前に終了しました")
+                *lines, buffer = (buffer + data).split(b"\n")
+                for line in lines:
+                    line = line.strip()
+                    if not line.startswith(b"data:"):
+                        continue  # 空行（イベントの区切り）やコメント・event: 行は読み飛ばす
+                    payload = line[len(b"data:"):].strip()
+                    if payload == b"[DONE]":
+                        return
+                    try:
+                        yield json.loads(payload)["delta"]
+                    except (ValueError, KeyError) as e:
+                        raise BackendError(f"{self.url} のイベントを解釈できません: {e}")
+
+
+async def _single_chunk(text: str):
+    yield text
+
+
+def _retry_after(headers):
+    """Retry-After ヘッダー（秒数）を読む。日付形式やヘッダーなしの場合は None"""
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class StubBackend:
+    """ネットワークを使わないオフライン用のスタブ。プロンプトから決まった本文を返す"""
+
+    name = "stub"
+
+    def __init__(self, model: str = "stub", latency: float = 0.0):
+        self.model = model
+        self.latency = latency
+
+    async def generate(self, prompt: str) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return stub_article_body(prompt)
+
+    async def stream(self, prompt: str):
+        body = await self.generate(prompt)
+        return _split_chunks(body)
+
+
+async def _split_chunks(text: str, size: int = STREAM_CHUNK_CHARS):
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+def stub_article_body(prompt: str) -> str:
+    """スタブ・偽サーバー共通のダミー記事本文"""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+    return (
+        "この記事はAIによって自動生成されています。\n\n"
+        f"## 概要\n\nスタブ応答です（プロンプトのハッシュ: {digest}）。\n\n"
+        "```python\nprint(\"Hello, World!\")\n```\n"
+    )
+
+
+BACKENDS = {
+    GeminiCLIBackend.name: GeminiCLIBackend,
+    HTTPBackend.name: HTTPBackend,
+    StubBackend.name: StubBackend,
+}
+
+
+def create_backend(name: str, **options):
+    """名前からバックエンドを作る。options は各バックエンドのコンストラクタ引数"""
+    if name not in BACKENDS:
+        raise ValueError(f"未知のバックエンドです: {name}（{', '.join(BACKENDS)} から選択）")
+    return BACKENDS[name](**options)
@@ -0,0 +1,78 @@
+# docs/ への出力書き込み
+# 内容が同じファイルは書き換えず（mtimeを変えず）、書き込みは一時ファイル＋renameで原子的に行う
+
+import hashlib
+import os
+from pathlib import Path
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_unchanged(path: Path, data: bytes) -> bool:
+    """既存ファイルの内容が data と同じか（サイズ → ハッシュの順に比較）"""
+    try:
+        if os.stat(path).st_size != len(data):
+            return False
+        return _file_digest(path) == hashlib.sha256(data).hexdigest()
+    except FileNotFoundError:
+        return False
+
+
+def atomic_write(path: Path, data: bytes):
+    """同じディレクトリの一時ファイルに書いてから置き換え、書きかけの状態を見せない"""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+
+def write_if_changed(path: Path, data: bytes) -> bool:
+    """内容が変わっている場合だけ書き込み、書き込んだかどうかを返す"""
+    if is_unchanged(path, data):
+        return False
+    atomic_write(path, data)
+    return True
+
+
+class OutputWriter:
+    """変更のあったファイルだけを書き込み、書き込み・スキップの件数を記録する"""
+
+    def __init__(self):
+        self.written = []  # 実際に書き込んだパス（後段の処理で変更分だけを扱うために使う）
+        self.skipped = 0
+        self.bytes_written = 0
+
+    def write_bytes(self, path: Path, data: bytes) -> bool:
+        written = write_if_changed(path, data)
+        self.record(path, written, len(data))
+        return written
+
+    def record(self, path: Path, written: bool, size: int):
+        """別のプロセスが write_if_changed() で書き込んだ結果を記録する"""
+        if written:
+            self.written.append(path)
+            self.bytes_written += size
+        else:
+            self.skipped += 1
+
+    def write_text(self, path: Path, text: str) -> bool:
+        return self.write_bytes(path, text.encode("utf-8"))
+
+    def copy(self, src: Path, dest: Path) -> bool:
+        with open(src, "rb") as f:
+            return self.write_bytes(dest, f.read())
+
+    def summary(self) -> str:
+        return f"出力: 書き込み {len(self.written)} 件 / 変更なし {self.skipped} 件"
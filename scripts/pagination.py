@@ -0,0 +1,82 @@
+# 一覧ページのページ分割とタグ別シャード
+
+from pathlib import Path
+
+DEFAULT_PAGE_SIZE = 50
+# ページ番号のリンクは、最初・最後のページと現在のページの前後この数のページだけに出す
+NAV_WINDOW = 2
+
+
+def page_url(base_url: str, page: int) -> str:
+    """base_url ("/" や "/python/") の page ページ目のURL。1ページ目は base_url そのもの"""
+    return base_url if page == 1 else f"{base_url}page/{page}/"
+
+
+def page_output_path(docs_dir: Path, base_url: str, page: int) -> Path:
+    return docs_dir / page_url(base_url, page).strip("/") / "index.html"
+
+
+def page_links(page: int, pages: int, page_urls: list) -> list:
+    """ページ番号のリンク [(ページ番号, URL), ...]。省略した範囲は None にする
+
+    全ページへのリンクを並べると出力の合計がページ数の2乗になるため、最初・前後 NAV_WINDOW ページ・最後だけにする。
+    """
+    numbers = sorted({1, pages, *range(max(1, page - NAV_WINDOW), min(pages, page + NAV_WINDOW) + 1)})
+    links = []
+    for n in numbers:
+        if links and n - links[-1][0] == 2:
+            links.append((n - 1, page_urls[n - 2]))  # 1ページだけの省略は「…」にせず番号を出す
+        elif links and n - links[-1][0] > 2:
+            links.append(None)
+        links.append((n, page_urls[n - 1]))
+    return links
+
+
+def paginate(articles: list, page_size: int, base_url: str):
+    """記事リストを page_size 件ずつに分け、(ページ番号, そのページの記事, テンプレート用のページ情報) を返す
+
+    記事が0件でも1ページ目は必ず返す。
+    """
+    if page_size < 1:
+        raise ValueError(f"1ページあたりの記事数は1以上にしてください: {page_size}")
+    pages = max(1, -(-len(articles) // page_size))
+    page_urls = [page_url(base_url, n) for n in range(1, pages + 1)]
+    for page in range(1, pages + 1):
+        offset = (page - 1) * page_size
+        pagination = {
+            "page": page,
+            "pages": pages,
+            "offset": offset,
+            "prev_url": page_urls[page - 2] if page > 1 else None,
+            "next_url": page_urls[page] if page < pages else None,
+            "links": page_links(page, pages, page_urls),
+        }
+        yield page, articles[offset:offset + page_size], pagination
+
+
+def tag_slug(tag: str) -> str:
+    """タグ名をURLに使える形にする（generate_articles.py のファイル名と同じ規則）"""
+    safe = "".join(c if c.isalnum() or c in ['-', '_'] else '_' for c in tag)
+    return '_'.join(filter(None, safe.split('_'))) or "_"
+
+
+def group_by_tag(articles: list) -> list:
+    """記事をタグごとにまとめ、(タグ名, タグのslug, [記事, ...]) をタグ名順に返す
+
+    異なるタグが同じslugになる場合は、後のタグに連番を付けて衝突を避ける。
+    """
+    by_tag = {}
+    for article in articles:
+        for tag in article.tags:
+            by_tag.setdefault(tag, []).append(article)
+    groups = []
+    used = set()
+    for tag in sorted(by_tag):
+        slug = base = tag_slug(tag)
+        n = 2
+        while slug in used:
+            slug = f"{base}-{n}"
+            n += 1
+        used.add(slug)
+        groups.append((tag, slug, by_tag[tag]))
+    return groups
@@ -0,0 +1,163 @@
+# docs/ の出力の事前圧縮
+# 静的ホスティングが Accept-Encoding に応じてそのまま返せるように、HTML/CSS/JS/JSON の隣に
+# .gz（zstandard がインストールされていれば .zst も）を置く。
+# 圧縮するのはビルドで書き換えたファイルと、圧縮ファイルがまだないファイルだけ。
+# 圧縮しても縮まないファイルは内容のハッシュを記録しておき、内容が変わるまで圧縮し直さない。
+
+import gzip
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from build_manifest import hash_bytes, hash_file
+from output_writer import atomic_write
+
+try:
+    import zstandard
+except ImportError:  # .zst は zstandard がある場合だけ作る
+    zstandard = None
+
+COMPRESSIBLE_SUFFIXES = (".html", ".css", ".js", ".json")
+# エンコーディング → 圧縮ファイルの拡張子
+SIDECAR_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+DEFAULT_LEVELS = {"gzip": 9, "zstd": 19}
+# これより小さいファイルは圧縮してもほとんど縮まないため、圧縮ファイルを置かない
+MIN_SIZE = 256
+
+
+def available_encodings() -> list:
+    return ["gzip", "zstd"] if zstandard is not None else ["gzip"]
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "gzip":
+        # mtime=0 にして、同じ入力からは同じバイト列を作る
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def sidecar_path(path: Path, encoding: str) -> Path:
+    return path.with_name(path.name + SIDECAR_SUFFIXES[encoding])
+
+
+def is_compressible(path: Path) -> bool:
+    return path.suffix in COMPRESSIBLE_SUFFIXES and not path.name.startswith(".")
+
+
+def remove_sidecars(path: Path):
+    """出力を削除するときに、その圧縮ファイルも削除する"""
+    for encoding in SIDECAR_SUFFIXES:
+        sidecar = sidecar_path(path, encoding)
+        if sidecar.exists():
+            sidecar.unlink()
+
+
+def scan_sidecars(root: Path, levels: dict, everything: bool = False, incompressible: dict = None) -> list:
+    """root 以下を走査し、圧縮ファイルが足りない出力（everything=True なら圧縮対象の出力すべて）のリストを返す
+
+    元のファイルがなくなった圧縮ファイルや、levels にないエンコーディングの圧縮ファイルはここで削除する
+    （levels が空なら圧縮ファイルをすべて削除する）。
+    incompressible（出力パス → 内容のハッシュ）にあり内容も同じ出力は、縮まないことがわかっているので返さない。
+    """
+    incompressible = incompressible or {}
+    sidecar_encodings = {suffix: encoding for encoding, suffix in SIDECAR_SUFFIXES.items()}
+    wanted = [SIDECAR_SUFFIXES[encoding] for encoding in levels]
+    missing = []
+    # 出力は数万件になりうるため、Path を作らずにファイル名の文字列だけで判定する
+    for dirpath, _, filenames in os.walk(root):
+        names = set(filenames)
+        for name in filenames:
+            base, suffix = os.path.splitext(name)
+            encoding = sidecar_encodings.get(suffix)
+            # サイトマップの .xml.gz のように、圧縮対象でないファイルの .gz はそれ自体が出力なので残す
+            if encoding is not None and os.path.splitext(base)[1] in COMPRESSIBLE_SUFFIXES:
+                if encoding not in levels or base not in names:
+                    os.unlink(os.path.join(dirpath, name))
+                continue
+            if not wanted or suffix not in COMPRESSIBLE_SUFFIXES or name.startswith("."):
+                continue
+            if everything:
+                missing.append(Path(dirpath, name))
+                continue
+            path = os.path.join(dirpath, name)
+            if any(name + sidecar not in names for sidecar in wanted) and os.path.getsize(path) >= MIN_SIZE:
+                recorded = incompressible.get(Path(path).as_posix())
+                if recorded is None or recorded != hash_file(path):
+                    missing.append(Path(dirpath, name))
+    return missing
+
+
+class PrecompressReport:
+    """圧縮したファイル数と、エンコーディングごとの圧縮前後のバイト数"""
+
+    def __init__(self, encodings):
+        self.files = 0
+        self.original = dict.fromkeys(encodings, 0)
+        self.compressed = dict.fromkeys(encodings, 0)
+        self.seconds = 0.0
+        self.incompressible = {}  # 圧縮しても縮まないエンコーディングがあった出力パス → 内容のハッシュ
+
+    def add(self, original_size: int, sizes: dict):
+        self.files += 1
+        for encoding, size in sizes.items():
+            self.original[encoding] += original_size
+            self.compressed[encoding] += size
+
+    def summary(self) -> str:
+        parts = [f"{encoding} {self.original[encoding] / 1024:.1f} KB → {self.compressed[encoding] / 1024:.1f} KB"
+                 f"（{self.compressed[encoding] / self.original[encoding]:.1%}）"
+                 for encoding in self.original if self.original[encoding]]
+        return f"事前圧縮: {self.files} ファイル、" + ("、".join(parts) or "対象なし") + f"（{self.seconds * 1000:.0f} ms）"
+
+
+def _compress_file(path: Path, levels: dict):
+    """path の圧縮ファイルを書き、(元のサイズ, {エンコーディング: 圧縮後のサイズ}, 縮まなかった場合は内容のハッシュ) を返す"""
+    with open(path, "rb") as f:
+        data = f.read()
+    sizes = {}
+    for encoding, level in levels.items():
+        sidecar = sidecar_path(path, encoding)
+        compressed = compress(data, encoding, level) if len(data) >= MIN_SIZE else None
+        if compressed is None or len(compressed) >= len(data):
+            # 縮まないなら元のファイルをそのまま返してもらう
+            if sidecar.exists():
+                sidecar.unlink()
+            continue
+        atomic_write(sidecar, compressed)
+        sizes[encoding] = len(compressed)
+    # MIN_SIZE 以上なのに縮まなかったものは、内容が変わるまで scan_sidecars() で圧縮し直さないよう記録する
+    incompressible = len(data) >= MIN_SIZE and len(sizes) < len(levels)
+    return len(data), sizes, hash_bytes(data) if incompressible else None
+
+
+def compress_files(paths, levels: dict, jobs: int = None) -> PrecompressReport:
+    """paths の圧縮ファイルを並列に作る。zlib・zstandard は圧縮中にGILを解放するため、スレッドで並列化する"""
+    start = time.perf_counter()
+    report = PrecompressReport(levels)
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        paths = sorted(paths)
+        for path, (original_size, sizes, digest) in zip(paths, executor.map(lambda path: _compress_file(path, levels), paths)):
+            report.add(original_size, sizes)
+            if digest is not None:
+                report.incompressible[path.as_posix()] = digest
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def precompress(root: Path, changed, levels: dict, everything: bool = False, jobs: int = None, incompressible: dict = None) -> PrecompressReport:
+    """changed（今回書き換えた出力）と、圧縮ファイルがまだない出力を圧縮する
+
+    levels はエンコーディング → 圧縮レベル。圧縮レベルを変えたときは everything=True ですべて圧縮し直す。
+    incompressible は前回までに記録した、縮まない出力のパス → 内容のハッシュ。
+    report.incompressible には、今回圧縮し直さなかった記録と新たに見つかったものを合わせて返す。
+    """
+    start = time.perf_counter()
+    targets = {Path(path) for path in changed if is_compressible(Path(path)) and Path(path).exists()}
+    targets.update(scan_sidecars(root, levels, everything, incompressible))
+    report = compress_files(targets, levels, jobs)
+    compressed = {path.as_posix() for path in targets}
+    kept = {path: digest for path, digest in (incompressible or {}).items() if path not in compressed and os.path.exists(path)}
+    report.incompressible = dict(kept, **report.incompressible)
+    report.seconds = time.perf_counter() - start
+    return report
@@ -0,0 +1,107 @@
+# 記事本文の一括生成用のレート制限とリトライ
+# リクエスト数/分・トークン数/分のトークンバケットで送信ペースを抑え、
+# 429や5xxが返ったときはジッター付きの指数バックオフで再試行する
+
+import asyncio
+import itertools
+import random
+import time
+
+from llm_backends import BackendError
+
+# 応答（記事本文）のトークン数の見積もり。プロンプトは1文字≒1トークンとして数える
+EXPECTED_OUTPUT_TOKENS = 2000
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数のおおまかな見積もり（日本語が中心なので1文字≒1トークンとする）"""
+    return len(text)
+
+
+class TokenBucket:
+    """1分あたり per_minute の割合で補充されるトークンバケット"""
+
+    def __init__(self, per_minute: float, burst_seconds: float = 10.0):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        """amount 分のトークンが貯まるまで待って消費する（容量を超える量は容量分として扱う）"""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, delta: float):
+        """見積もりと実際の消費量の差を反映する（負になった分は次の補充で返済する）"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + delta)
+
+
+class RequestScheduler:
+    """レート制限とリトライをまとめてバックエンド呼び出しに適用する"""
+
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None,
+                 max_retries: int = 5, backoff_base: float = 1.0, backoff_max: float = 60.0):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retries = 0
+
+    def backoff_delay(self, attempt: int, retry_after: float = None) -> float:
+        """指数バックオフ（フルジッター）。サーバーが Retry-After を返した場合はそれ以上待つ"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    async def _request(self, request, estimated: float):
+        """レート制限を守って request() を呼び、一時的な失敗ならバックオフして再試行する"""
+        for attempt in itertools.count():
+            if self.request_bucket is not None:
+                await self.request_bucket.acquire(1)
+            if self.token_bucket is not None:
+                await self.token_bucket.acquire(estimated)
+            try:
+                return await request()
+            except BackendError as e:
+                if not e.retryable or attempt >= self.max_retries:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self.backoff_delay(attempt, e.retry_after))
+
+    async def call(self, backend, prompt: str) -> str:
+        estimated = estimate_tokens(prompt) + EXPECTED_OUTPUT_TOKENS
+        response = await self._request(lambda: backend.generate(prompt), estimated)
+        if self.token_bucket is not None:
+            self.token_bucket.adjust(estimated - estimate_tokens(prompt) - estimate_tokens(response))
+        return response
+
+    async def stream(self, backend, prompt: str):
+        """backend.stream() を開き、本文の断片を返す非同期イテレーターを返す
+
+        リトライするのはストリームを開くまで（ステータスが返るまで）。受信途中の失敗は再試行しない。
+        """
+        estimated = estimate_tokens(prompt) + EXPECTED_OUTPUT_TOKENS
+        chunks = await self._request(lambda: backend.stream(prompt), estimated)
+        return self._count_tokens(chunks, prompt, estimated)
+
+    async def _count_tokens(self, chunks, prompt: str, estimated: float):
+        received = 0
+        async for chunk in chunks:
+            received += estimate_tokens(chunk)
+            yield chunk
+        if self.token_bucket is not None:
+            self.token_bucket.adjust(estimated - estimate_tokens(prompt) - received)
@@ -0,0 +1,93 @@
+# 記事本文生成の応答キャッシュ
+# (日付以外を埋めたプロンプト, モデル名, パラメータ) のハッシュをキーに、モデルの応答をzlib圧縮して保存する。
+# 同じトピック・同じプロンプトの再生成ではAPIを呼ばずにキャッシュを使う。
+
+import datetime
+import hashlib
+import json
+import os
+import zlib
+from pathlib import Path
+
+CACHE_DIR = Path(".generation_cache")
+
+
+def make_key(prompt: str, model: str, params: dict) -> str:
+    payload = json.dumps([prompt, model, params], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """キー → 圧縮済み応答（blobs/）と、どのトピックの応答かを記録する索引（index.jsonl）
+
+    索引は追記のみで、同じキーが複数回現れた場合は最後の行が最新。
+    """
+
+    def __init__(self, directory: Path = CACHE_DIR):
+        self.directory = directory
+        self.index_path = directory / "index.jsonl"
+        self.hits = 0
+        self.misses = 0
+
+    def _blob_path(self, key: str) -> Path:
+        return self.directory / "blobs" / key[:2] / (key + ".z")
+
+    def get(self, key: str):
+        try:
+            with open(self._blob_path(key), "rb") as f:
+                text = zlib.decompress(f.read()).decode("utf-8")
+        except (OSError, zlib.error):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return text
+
+    def put(self, key: str, text: str, **info):
+        """応答を保存し、索引に1行追記する。info には言語・テーマなど任意の情報を渡す"""
+        writer = self.open(key, **info)
+        writer.write(text)
+        writer.commit()
+
+    def open(self, key: str, **info) -> "CacheWriter":
+        """応答を断片ごとに圧縮しながら保存する書き込み口を返す（ストリーミング応答用）"""
+        return CacheWriter(self, key, info)
+
+    def _record(self, key: str, size: int, info: dict):
+        entry = {"key": key, "bytes": size, "created": datetime.datetime.now().isoformat(timespec="seconds")}
+        entry.update(info)
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+class CacheWriter:
+    """応答を zlib で逐次圧縮して一時ファイルに書き、commit() で保存を確定する
+
+    応答が途中で途切れた場合は discard() で捨て、不完全な応答をキャッシュに残さない。
+    """
+
+    def __init__(self, cache: ResponseCache, key: str, info: dict):
+        self.cache = cache
+        self.key = key
+        self.info = info
+        self.path = cache._blob_path(key)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.{id(self)}.tmp")
+        self._file = open(self.tmp_path, "wb")
+        self._compressor = zlib.compressobj(9)
+        self.bytes = 0
+
+    def write(self, text: str):
+        data = text.encode("utf-8")
+        self.bytes += len(data)
+        self._file.write(self._compressor.compress(data))
+
+    def commit(self):
+        self._file.write(self._compressor.flush())
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+        self.cache._record(self.key, self.bytes, self.info)
+
+    def discard(self):
+        self._file.close()
+        if self.tmp_path.exists():
+            self.tmp_path.unlink()
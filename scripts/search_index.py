@@ -0,0 +1,180 @@
+# サイト内検索用の静的インデックス
+# 記事のタイトル・タグ・descriptionから転置インデックスを作り、docs/search/ にJSONで分割して出力する。
+# 日本語は分かち書きせず文字の1-gram・2-gramで引き、英数字は単語単位で引く。
+# ブラウザ側（templates/search.js）はクエリの語が入っているシャードだけを取得する。
+
+import json
+import math
+import re
+import unicodedata
+from array import array
+
+INDEX_VERSION = 1
+# 記事のフィールドごとの重み（タイトルに含まれる語ほど上位にする）
+FIELD_WEIGHTS = {"title": 3, "tags": 2, "description": 1}
+# 1シャードのおおよその大きさ。シャード数はこれを超えないように2の累乗で決める
+TARGET_SHARD_BYTES = 64 * 1024
+# これより多くの記事に出る語（「入門」やタグなど）は、ほかの語と同じシャードに入れず単独のファイルにする
+LARGE_TERM_POSTINGS = 2000
+# 1件の出現（記事番号の差分とスコア）のJSONでのおおよそのバイト数
+POSTING_BYTES = 5
+# 検索結果の表示用の記事情報（URL・タイトル・説明）を1ファイルにまとめる件数
+DOCS_PER_CHUNK = 100
+DESCRIPTION_CHARS = 80
+
+# 英数字の並び、またはASCII以外の文字・数字（かな・漢字など）の並び。記号と空白は区切りとして捨てる
+# （search.js の RUN_RE と同じ規則）
+RUN_RE = re.compile(r"[a-z0-9]+|[^\W_\x00-\x7f]+")
+# ひらがな・カタカナ1文字は検索語として意味をなさないため、1-gramとしては索引に入れない
+KANA_RE = re.compile(r"[\u3040-\u30ff]")
+
+
+def normalize(text: str) -> str:
+    """全角英数字を半角に、英字を小文字にそろえる"""
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def tokenize(text: str) -> list:
+    """文書側のトークン化。英数字は単語、それ以外は1文字（かなを除く）と隣り合う2文字の組"""
+    tokens = []
+    for run in RUN_RE.findall(normalize(text)):
+        if run.isascii():
+            tokens.append(run)
+            continue
+        tokens.extend(ch for ch in run if not KANA_RE.match(ch))
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def query_terms(text: str) -> list:
+    """検索語側のトークン化。2文字以上の並びは2-gramだけで引く（1-gramより絞り込める）
+
+    templates/search.js の queryTerms と同じ規則にすること。
+    """
+    terms = []
+    for run in RUN_RE.findall(normalize(text)):
+        if run.isascii() or len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return list(dict.fromkeys(terms))
+
+
+def shard_of(term: str, shards: int) -> int:
+    """語 → シャード番号。FNV-1a（32bit）をコードポイント単位で計算する（search.js と同じ）"""
+    h = 0x811C9DC5
+    for ch in term:
+        h = ((h ^ ord(ch)) * 0x01000193) & 0xFFFFFFFF
+    return h % shards
+
+
+def shard_count(postings: int) -> int:
+    """出現の総数からシャード数（2の累乗）を決める"""
+    count = 1
+    while count * TARGET_SHARD_BYTES < postings * POSTING_BYTES:
+        count *= 2
+    return count
+
+
+def encode_postings(flat: array) -> array:
+    """[記事番号, スコア, ...]（記事番号の昇順）→ [記事番号の差分, スコア, ...]（flat をそのまま書き換えて返す）"""
+    for i in range(len(flat) - 2, 0, -2):
+        flat[i] -= flat[i - 2]
+    return flat
+
+
+def article_url(meta) -> str:
+    return f"/{meta.language_slug}/{meta.slug}.html"
+
+
+def build_search_index(metas: list) -> dict:
+    """記事のメタデータのリストから、出力ファイル名 → encode() でJSONにできる値 の辞書を作る
+
+    - meta.json: シャード数・記事数など、ローダーが最初に読む情報。large は単独ファイルにした語 → ファイル番号
+    - terms-N.json: {語: [記事番号の差分, スコア, 記事番号の差分, スコア, ...]}（記事番号の昇順）
+    - large-N.json: 出現する記事が多い1語分の [記事番号の差分, スコア, ...]
+    - docs-N.json: [[URL, タイトル, 説明], ...]（記事番号 N*DOCS_PER_CHUNK から順に）
+    """
+    # 語 -> [記事番号, スコア, 記事番号, スコア, ...]。記事番号の順に追加するので並べ替えは要らない
+    # （記事ごとの辞書を持たず、出現は int の array で持つため、記事数が多くてもメモリが小さく済む）
+    postings = {}
+    for doc_id, meta in enumerate(metas):
+        scores = {}
+        fields = {"title": meta.title, "tags": " ".join(meta.tags), "description": meta.description}
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text or ""):
+                scores[token] = scores.get(token, 0) + weight
+        for token, score in scores.items():
+            flat = postings.get(token)
+            if flat is None:
+                flat = postings[token] = array("i")
+            flat.extend((doc_id, score))
+
+    large_terms = sorted(term for term, flat in postings.items() if len(flat) // 2 > LARGE_TERM_POSTINGS)
+    shards = shard_count(sum(len(flat) // 2 for flat in postings.values() if len(flat) // 2 <= LARGE_TERM_POSTINGS))
+    files = {f"terms-{n}.json": {} for n in range(shards)}
+    for n, term in enumerate(large_terms):
+        files[f"large-{n}.json"] = encode_postings(postings.pop(term))
+    for term in sorted(postings):
+        files[f"terms-{shard_of(term, shards)}.json"][term] = encode_postings(postings[term])
+
+    for start in range(0, len(metas), DOCS_PER_CHUNK):
+        files[f"docs-{start // DOCS_PER_CHUNK}.json"] = [
+            [article_url(meta), meta.title, (meta.description or "")[:DESCRIPTION_CHARS]]
+            for meta in metas[start:start + DOCS_PER_CHUNK]
+        ]
+    files["meta.json"] = {
+        "version": INDEX_VERSION,
+        "docs": len(metas),
+        "terms": len(postings) + len(large_terms),
+        "shards": shards,
+        "large": {term: n for n, term in enumerate(large_terms)},
+        "docs_per_chunk": DOCS_PER_CHUNK,
+    }
+    return files
+
+
+def term_file(meta: dict, term: str) -> str:
+    """語の出現が入っているファイル名（search.js の termFile と同じ）"""
+    if term in meta["large"]:
+        return f"large-{meta['large'][term]}.json"
+    return f"terms-{shard_of(term, meta['shards'])}.json"
+
+
+def _json_default(value):
+    if isinstance(value, array):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} はJSONに変換できません")
+
+
+def encode(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+def search(files: dict, query: str, limit: int = 20) -> list:
+    """build_search_index() の出力に対する検索（search.js と同じ採点。動作確認・ベンチマーク用）"""
+    meta = files["meta.json"]
+    terms = query_terms(query)
+    if not terms:
+        return []
+    scores = None
+    for term in terms:
+        postings = files[term_file(meta, term)]
+        flat = postings if term in meta["large"] else postings.get(term)
+        if not flat:
+            return []
+        # 多くの記事に出る語ほど重みを下げる
+        idf = math.log(1 + meta["docs"] / (len(flat) // 2))
+        term_scores = {}
+        doc_id = 0
+        for i in range(0, len(flat), 2):
+            doc_id += flat[i]
+            term_scores[doc_id] = flat[i + 1] * idf
+        if scores is None:
+            scores = term_scores
+        else:
+            scores = {doc_id: score + term_scores[doc_id] for doc_id, score in scores.items() if doc_id in term_scores}
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    per_chunk = meta["docs_per_chunk"]
+    return [files[f"docs-{doc_id // per_chunk}.json"][doc_id % per_chunk] for doc_id, _ in ranked]
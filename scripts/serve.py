@@ -0,0 +1,295 @@
+# 開発用サーバー
+# docs/ をHTTPで配信しながら articles/ と templates/ を監視し、変更された記事と
+# その記事を載せている一覧ページだけを再生成して、ブラウザにライブリロードを送る
+#
+# 使い方: python scripts/serve.py [--port 8000] [--poll] [--css-classes] [--page-size 50] [--precompress]
+
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from build_manifest import BuildManifest, hash_file
+from build_site import (ARTICLES_DIR, DOCS_DIR, MANIFEST_PATH, SEARCH_DIR, STATIC_FILES, TEMPLATES_DIR, PageCache,
+                        article_output_path, article_template_hashes, build, create_environment, create_markdown, iter_languages,
+                        output_url, page_size_arg, precompression_levels, process_markdown_file, remove_stale_outputs, write_indexes,
+                        write_search_index)
+from fs_watch import create_watcher
+from output_writer import OutputWriter
+from pagination import DEFAULT_PAGE_SIZE
+from precompress import compress_files, is_compressible, remove_sidecars
+
+LIVERELOAD_PATH = "/__livereload"
+LIVERELOAD_SCRIPT = f"""<script>
+(function () {{
+  var source = new EventSource("{LIVERELOAD_PATH}");
+  source.onmessage = function (event) {{
+    var data = JSON.parse(event.data);
+    var path = location.pathname.replace(/index\\.html$/, "");
+    if (data.reload_all || data.urls.indexOf(path) >= 0) location.reload();
+  }};
+}})();
+</script>
+""".encode("utf-8")
+# 変更が落ち着いてから検索インデックスとマニフェストを更新する（1記事ごとに全体を書き出さない）
+SAVE_IDLE_SECONDS = 1.0
+KEEPALIVE_SECONDS = 15.0
+
+
+class LiveReload:
+    """再生成したページのURLを、接続中のブラウザ（EventSource）に配る"""
+
+    def __init__(self):
+        self.version = 0
+        self.message = None
+        self._condition = threading.Condition()
+
+    def publish(self, urls, reload_all: bool = False):
+        with self._condition:
+            self.version += 1
+            self.message = json.dumps({"urls": sorted(urls), "reload_all": reload_all})
+            self._condition.notify_all()
+
+    def wait(self, version: int, timeout: float):
+        """version より新しい通知を待つ。(最新のversion, 通知内容 or None) を返す"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != version, timeout)
+            return self.version, (self.message if self.version != version else None)
+
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=str(DOCS_DIR), **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+    def end_headers(self):
+        self.send_header("Cache-Control", "no-store")
+        super().end_headers()
+
+    def do_GET(self):
+        if self.path == LIVERELOAD_PATH:
+            self._serve_events()
+            return
+        path = Path(self.translate_path(self.path))
+        if path.is_dir() and self.path.endswith("/"):
+            path = path / "index.html"
+        if path.suffix == ".html" and path.is_file():
+            self._serve_html(path)
+            return
+        super().do_GET()
+
+    def _serve_html(self, path: Path):
+        """HTMLにライブリロード用のスクリプトを差し込んで返す（docs/ のファイル自体は変えない）"""
+        with open(path, "rb") as f:
+            body = f.read()
+        pos = body.rfind(b"</body>")
+        body = body[:pos] + LIVERELOAD_SCRIPT + body[pos:] if pos >= 0 else body + LIVERELOAD_SCRIPT
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _serve_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        livereload = self.server.livereload
+        version = livereload.version
+        try:
+            while True:
+                version, message = livereload.wait(version, KEEPALIVE_SECONDS)
+                self.wfile.write(f"data: {message}\n\n".encode("utf-8") if message else b": keepalive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class DevServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, livereload: LiveReload):
+        super().__init__(address, DevRequestHandler)
+        self.livereload = livereload
+
+
+class SiteWatcher:
+    """docs/ を最新に保ち、変更されたファイルに応じて必要な出力だけを再生成する"""
+
+    def __init__(self, css_classes: bool = False, page_size: int = DEFAULT_PAGE_SIZE, jobs: int = 1, highlight_cache: bool = True,
+                 precompress_levels: dict = None):
+        self.css_classes = css_classes
+        self.page_size = page_size
+        self.jobs = jobs
+        self.highlight_cache = highlight_cache
+        self.precompress_levels = precompress_levels or {}
+        self.dirty = False
+        self.search_dirty = False
+        self.compress_pending = set()  # 圧縮ファイルを作り直す出力（変更が落ち着いてからまとめて圧縮する）
+        self._full_build()
+
+    def _full_build(self):
+        """差分ビルドでdocs/を最新にし、以降の再生成に使う状態を作り直す"""
+        build(jobs=self.jobs, highlight_cache=self.highlight_cache, css_classes=self.css_classes, page_size=self.page_size,
+              precompress_levels=self.precompress_levels)
+        self.manifest = BuildManifest.load(MANIFEST_PATH)
+        self.env = create_environment(self.css_classes)
+        self.article_templates = article_template_hashes(self.env)
+        self.base_template = self.env.get_template("base.html")
+        self.md = create_markdown(highlight_cache=self.highlight_cache, css_classes=self.css_classes)
+        self.languages = [(name, slug, [mdfile.as_posix() for mdfile in mdfiles]) for name, slug, mdfiles in iter_languages()]
+        self.search_outputs = [Path(path) for path in self.manifest.index_outputs if SEARCH_DIR in Path(path).parents]
+        # 一覧ページの入力を記録しておき、以降は入力が変わったページだけを描画する。
+        # 記録はマニフェストと共有し、ここで描画したページを次の build_site.py が古い記録のまま飛ばさないようにする
+        self.page_cache = PageCache(self.manifest.index_pages, remember_inputs=True)
+        self._write_indexes(OutputWriter())
+
+    def _write_indexes(self, writer: OutputWriter):
+        index_outputs = write_indexes(self.env, [(name, slug, [self.manifest.get_meta(source) for source in sources])
+                                                 for name, slug, sources in self.languages], writer, self.page_size, self.page_cache)
+        self.page_cache.retain(index_outputs)
+        self._set_index_outputs(index_outputs + self.search_outputs)
+
+    def _set_index_outputs(self, outputs: list):
+        remove_stale_outputs(self.manifest.index_outputs, outputs)
+        self.manifest.index_outputs = [path.as_posix() for path in outputs]
+
+    def _write_search_index(self, writer: OutputWriter):
+        previous = set(self.search_outputs)
+        self.search_outputs = write_search_index(self.env, [self.manifest.get_meta(source) for _, _, sources in self.languages
+                                                            for source in sources], writer)
+        self.compress_pending.update(writer.written)
+        self._set_index_outputs([Path(path) for path in self.manifest.index_outputs if Path(path) not in previous] + self.search_outputs)
+
+    def _render_article(self, mdfile: Path, writer: OutputWriter):
+        source = mdfile.as_posix()
+        language_slug = mdfile.parent.name.lower()
+        output_path = article_output_path(mdfile, language_slug)
+        processed_data = process_markdown_file(mdfile, self.env, self.base_template, language_slug, self.md)
+        writer.write_text(output_path, processed_data["html"])
+        self.manifest.record(source, hash_file(mdfile), self.article_templates, output_path, processed_data["meta"])
+
+    def _remove_article(self, mdfile: Path):
+        output_path = self.manifest.remove(mdfile.as_posix())
+        if output_path.exists():
+            output_path.unlink()
+        remove_sidecars(output_path)
+
+    def rebuild(self, changed: set) -> dict:
+        """変更されたパスに応じて再生成し、{"written": [出力パス], "reload_all": bool} を返す"""
+        writer = OutputWriter()
+        templates = {path for path in changed if TEMPLATES_DIR in path.parents}
+        articles = sorted(path for path in changed if ARTICLES_DIR in path.parents and path.suffix == ".md"
+                          and path.parent.parent == ARTICLES_DIR)
+        # CSS・JSを変えるとハッシュ付きのURLが変わり、全ページがそれを参照し直す
+        assets_changed = any(TEMPLATES_DIR / name in templates for name in STATIC_FILES)
+        if assets_changed or any(path.suffix == ".html" for path in templates):
+            if assets_changed or article_template_hashes(self.env) != self.article_templates:
+                # 記事ページが依存するテンプレート（base.html など）やアセットの変更は全記事に及ぶため、並列の差分ビルドに任せる
+                self._full_build()
+                return {"written": None, "reload_all": True}
+            # 一覧ページ用のテンプレートだけの変更なら、そのテンプレートを使うページだけが描画し直される
+            self._write_indexes(writer)
+            self.dirty = True
+
+        membership_changed = False
+        for mdfile in articles:
+            if mdfile.exists():
+                membership_changed |= mdfile.as_posix() not in self.manifest.entries
+                self._render_article(mdfile, writer)
+            elif mdfile.as_posix() in self.manifest.entries:
+                self._remove_article(mdfile)
+                membership_changed = True
+        if membership_changed:
+            self.languages = [(name, slug, [mdfile.as_posix() for mdfile in mdfiles]) for name, slug, mdfiles in iter_languages()]
+        if articles:
+            self._write_indexes(writer)
+            self.dirty = self.search_dirty = True
+        self.compress_pending.update(writer.written)
+        return {"written": writer.written, "reload_all": False}
+
+    def save(self):
+        """変更が落ち着いたときに呼ぶ。検索インデックスと圧縮ファイルを作り直し、マニフェストを保存する"""
+        if self.search_dirty:
+            self._write_search_index(OutputWriter())
+            self.search_dirty = False
+        if self.compress_pending:
+            if self.precompress_levels:
+                compress_files([path for path in self.compress_pending if is_compressible(path) and path.exists()],
+                               self.precompress_levels)
+            self.compress_pending.clear()
+        if self.dirty:
+            self.manifest.index_pages = self.page_cache.entries
+            self.manifest.save()
+            self.dirty = False
+
+
+def watch(site: SiteWatcher, livereload: LiveReload, polling: bool = False):
+    watcher = create_watcher([ARTICLES_DIR, TEMPLATES_DIR], polling)
+    print(f"{ARTICLES_DIR}/ と {TEMPLATES_DIR}/ を監視しています（{type(watcher).__name__}）。")
+    try:
+        while True:
+            changed = watcher.wait(SAVE_IDLE_SECONDS)
+            if not changed:
+                site.save()
+                continue
+            start = time.perf_counter()
+            # 監視で得たパスを articles/ ・ templates/ からの相対パスにそろえる
+            changed = {Path(os.path.relpath(path)) for path in changed}
+            try:
+                result = site.rebuild(changed)
+            except Exception as e:  # 書きかけのMarkdownなどで失敗しても監視は続ける
+                print(f"再生成に失敗しました: {e}")
+                continue
+            if result["written"] is None:
+                livereload.publish([], reload_all=True)
+                print(f"テンプレートの変更を反映しました（{(time.perf_counter() - start) * 1000:.0f} ms）。")
+                continue
+            if not result["written"] and not result["reload_all"]:
+                continue
+            livereload.publish([output_url(path) for path in result["written"]], reload_all=result["reload_all"])
+            print(f"{len(changed)} 件の変更で {len(result['written'])} ファイルを再生成しました"
+                  f"（{(time.perf_counter() - start) * 1000:.0f} ms）。")
+    finally:
+        site.save()
+        watcher.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="docs/ を配信し、記事・テンプレートの変更を監視して差分だけを再生成します。")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--poll", action="store_true", help="inotifyを使わずポーリングで変更を監視する")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="起動時のビルドの並列プロセス数（0でCPU数）")
+    parser.add_argument("--css-classes", action="store_true", help="build_site.py の --css-classes と同じ")
+    parser.add_argument("--page-size", type=page_size_arg, default=DEFAULT_PAGE_SIZE, help="一覧ページ1ページあたりの記事数")
+    parser.add_argument("--precompress", action="store_true", help="build_site.py の --precompress と同じ（既定の圧縮レベル）")
+    args = parser.parse_args(argv)
+    if args.jobs == 0:
+        args.jobs = os.cpu_count() or 1
+    return args
+
+
+def main():
+    args = parse_args()
+    site = SiteWatcher(css_classes=args.css_classes, page_size=args.page_size, jobs=args.jobs,
+                       precompress_levels=precompression_levels() if args.precompress else None)
+    livereload = LiveReload()
+    server = DevServer((args.host, args.port), livereload)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"http://{args.host}:{args.port}/ で配信しています（Ctrl+C で終了）。")
+    try:
+        watch(site, livereload, polling=args.poll)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# sitemap.xml と robots.txt の生成
+# 記事ページと一覧ページのURLを sitemap.xml に載せる。URLが50,000件か50MBを超える場合は、
+# sitemap.xml をサイトマップインデックスにして、セクション（言語ごとの記事・一覧ページ）ごとに
+# 分けたサイトマップを docs/sitemaps/ に gzip 圧縮して置く。
+
+import datetime
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+# サイトマップの仕様上の上限（1ファイルあたりのURL数と、圧縮前のバイト数）
+MAX_URLS = 50000
+MAX_BYTES = 50 * 1024 * 1024
+SITEMAP_NAME = "sitemap.xml"
+SHARD_DIR = "sitemaps"
+XMLNS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+URLSET_START = f'{XML_DECLARATION}<urlset xmlns="{XMLNS}">\n'
+URLSET_END = "</urlset>\n"
+# クロールさせる必要のないパス（検索ページはクライアント側で動き、インデックスのJSONも数が多い）
+DISALLOW = ("/search/",)
+
+
+def lastmod(date, modified: str = None) -> str:
+    """Front Matterの日付と、ソースの内容が最後に変わった日（YYYY-MM-DD）のうち新しいほう。どちらもなければ None"""
+    candidates = [modified] if modified else []
+    if isinstance(date, datetime.date):
+        candidates.append(date.isoformat())
+    return max(candidates, default=None)
+
+
+def absolute_url(site_url: str, path: str) -> str:
+    """サイトのURLと "/python/01_入門.html" のようなパスから、パーセントエンコードした絶対URLを作る"""
+    return site_url.rstrip("/") + quote(path)
+
+
+def url_element(loc: str, modified: str = None) -> str:
+    # loc はパーセントエンコード済みなので、要素はASCIIだけになる（len() がそのままバイト数になる）
+    if modified:
+        return f"<url><loc>{escape(loc)}</loc><lastmod>{modified}</lastmod></url>\n"
+    return f"<url><loc>{escape(loc)}</loc></url>\n"
+
+
+def urlset(elements: list) -> bytes:
+    return (URLSET_START + "".join(elements) + URLSET_END).encode("utf-8")
+
+
+def sitemap_index(entries: list) -> bytes:
+    """entries は (サイトマップの絶対URL, その中で最も新しい lastmod or None) のリスト"""
+    lines = [XML_DECLARATION, f'<sitemapindex xmlns="{XMLNS}">\n']
+    for loc, modified in entries:
+        lines.append(f"<sitemap><loc>{escape(loc)}</loc>" + (f"<lastmod>{modified}</lastmod>" if modified else "") + "</sitemap>\n")
+    lines.append("</sitemapindex>\n")
+    return "".join(lines).encode("utf-8")
+
+
+def split_section(urls: list, max_urls: int, max_bytes: int) -> list:
+    """(要素, lastmod) のリストを、1ファイルの上限に収まるまとまりに分ける"""
+    shards = [[]]
+    size = len(URLSET_START) + len(URLSET_END)
+    for element, modified in urls:
+        if shards[-1] and (len(shards[-1]) >= max_urls or size + len(element) > max_bytes):
+            shards.append([])
+            size = len(URLSET_START) + len(URLSET_END)
+        shards[-1].append((element, modified))
+        size += len(element)
+    return shards
+
+
+def build_sitemaps(site_url: str, sections: dict, max_urls: int = MAX_URLS, max_bytes: int = MAX_BYTES) -> dict:
+    """docs/ からの相対パス → 圧縮前のサイトマップ
+
+    sections はセクション名 → [(URLのパス, lastmod or None), ...]。
+    全体が1ファイルの上限に収まれば sitemap.xml だけを返す。収まらなければ sitemap.xml を
+    サイトマップインデックスにし、セクションごとのサイトマップ sitemaps/<セクション>-<N>.xml.gz を返す
+    （.gz のものは呼び出し側で圧縮して書き込む）。
+    """
+    urls = {name: [(url_element(absolute_url(site_url, path), modified), modified) for path, modified in entries]
+            for name, entries in sections.items()}
+    total_urls = sum(len(entries) for entries in urls.values())
+    total_bytes = len(URLSET_START) + len(URLSET_END) + sum(len(element) for entries in urls.values() for element, _ in entries)
+    if total_urls <= max_urls and total_bytes <= max_bytes:
+        return {SITEMAP_NAME: urlset([element for entries in urls.values() for element, _ in entries])}
+
+    files = {}
+    index_entries = []
+    for name, entries in urls.items():
+        if not entries:
+            continue
+        for n, shard in enumerate(split_section(entries, max_urls, max_bytes), 1):
+            path = f"{SHARD_DIR}/{name}-{n}.xml.gz"
+            files[path] = urlset([element for element, _ in shard])
+            index_entries.append((absolute_url(site_url, "/" + path), max((modified for _, modified in shard if modified), default=None)))
+    files[SITEMAP_NAME] = sitemap_index(index_entries)
+    return files
+
+
+def robots_txt(site_url: str = None) -> str:
+    """すべてのクローラーに DISALLOW 以外を許可し、サイトのURLがわかっていればサイトマップの場所を書く"""
+    lines = ["User-agent: *"] + [f"Disallow: {path}" for path in DISALLOW]
+    if site_url:
+        lines += ["", f"Sitemap: {absolute_url(site_url, '/' + SITEMAP_NAME)}"]
+    return "\n".join(lines) + "\n"
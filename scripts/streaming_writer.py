@@ -0,0 +1,107 @@
+# モデルの応答を断片ごとに記事ファイルへ書き込む
+# 応答全体をメモリに溜めずに一時ファイルへ逐次書き込み、完了したら rename で原子的に置き換える
+
+import hashlib
+import os
+import time
+from pathlib import Path
+
+from front_matter import FENCE, parse_front_matter, split_front_matter
+
+
+class ArticleComposer:
+    """応答の断片を受け取り、compose_article と同じ記事ファイルの内容を先頭から順に返す
+
+    header(description) は記事のFront Matterを返す関数。応答の先頭にFront Matterがあれば
+    閉じの --- まで溜めて description を取り出し、以降の本文はそのまま流す。
+    本文の前後の空白は compose_article と同じく取り除く（末尾の空白は次の断片が来るまで保留する）。
+    """
+
+    def __init__(self, header):
+        self.header = header
+        self.buffer = ""      # Front Matterの判定が済むまでの応答の先頭
+        self.started = False  # Front Matterを書き終え、本文を流しているか
+        self.pending = ""     # 本文の末尾の空白（後ろに文字が続けば書き出す）
+        self.in_body = False  # 本文の最初の空白以外の文字を書き出したか
+
+    def _start(self, description: str, body: str) -> str:
+        self.started = True
+        self.buffer = ""
+        return self.header(description) + "\n" + self._body(body)
+
+    def _body(self, text: str) -> str:
+        if not self.in_body:
+            text = text.lstrip()
+            self.in_body = bool(text)
+        text = self.pending + text
+        stripped = text.rstrip()
+        self.pending = text[len(stripped):]
+        return stripped
+
+    def feed(self, text: str) -> str:
+        if self.started:
+            return self._body(text)
+        self.buffer = (self.buffer + text).lstrip()
+        if not self.buffer:
+            return ""
+        if not (FENCE + "\n").startswith(self.buffer[:len(FENCE) + 1]):
+            return self._start("", self.buffer)  # Front Matterなし
+        # 閉じの --- の行が改行まで届いてから判定する
+        complete = self.buffer[:self.buffer.rfind("\n") + 1]
+        fm_text, body = split_front_matter(complete)
+        if fm_text is None:
+            return ""
+        return self._start(parse_front_matter(fm_text)["description"], body + self.buffer[len(complete):])
+
+    def close(self) -> str:
+        if self.started:
+            return "\n"
+        fm_text, body = split_front_matter(self.buffer)
+        description = parse_front_matter(fm_text)["description"] if fm_text is not None else ""
+        return self._start(description, body) + "\n"
+
+
+class StreamingFile:
+    """path の一時ファイルに逐次書き込み、commit() で path に置き換える
+
+    書き込んだ内容のsha256と、作成から最初の書き込みまでの秒数（first_write）を記録する。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.tmp_path, "wb")
+        self._hash = hashlib.sha256()
+        self._created = time.perf_counter()
+        self.first_write = None
+        self.bytes = 0
+
+    def write(self, text: str):
+        if not text:
+            return
+        data = text.encode("utf-8")
+        self._file.write(data)
+        self._hash.update(data)
+        self.bytes += len(data)
+        if self.first_write is None:
+            # 最初の断片はすぐディスク上に見えるようにする（以降はバッファが溜まるごとに書き出される）
+            self._file.flush()
+            self.first_write = time.perf_counter() - self._created
+
+    @property
+    def digest(self) -> str:
+        return self._hash.hexdigest()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def commit(self):
+        self.close()
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self):
+        self.close()
+        if self.tmp_path.exists():
+            self.tmp_path.unlink()
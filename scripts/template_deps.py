@@ -0,0 +1,36 @@
+# テンプレートの依存関係
+# {% extends %} / {% include %} / {% import %} をたどり、あるテンプレートの出力が
+# どのテンプレートに依存するかを求める。差分ビルドで「どのテンプレートが変わったら
+# どの出力を作り直すか」の判定に使う。
+
+from jinja2 import Environment, meta
+
+from build_manifest import hash_bytes
+
+
+def template_dependencies(env: Environment, name: str) -> list:
+    """name 自身と、extends/include などで参照しているテンプレートを（推移的に）名前順で返す
+
+    テンプレート名が変数で決まる参照は静的に追えないため、その場合はすべてのテンプレートに依存するとみなす。
+    """
+    seen = set()
+    stack = [name]
+    while stack:
+        current = stack.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        source, _, _ = env.loader.get_source(env, current)
+        for referenced in meta.find_referenced_templates(env.parse(source)):
+            if referenced is None:
+                stack.extend(env.list_templates(extensions=["html"]))
+            else:
+                stack.append(referenced)
+    return sorted(seen)
+
+
+def template_hashes(env: Environment, name: str) -> dict:
+    """name の出力が依存するテンプレート → ソースのハッシュ"""
+    return {dependency: hash_bytes(env.loader.get_source(env, dependency)[0].encode("utf-8"))
+            for dependency in template_dependencies(env, name)}
+
@@ -0,0 +1,131 @@
+// サイト内検索（docs/search/ の静的インデックスを使う）
+// 検索語に含まれる語のシャード（または単独ファイル）だけを取得する。トークン化とシャードの割り当ては scripts/search_index.py と同じ規則
+(function () {
+  "use strict";
+
+  var INDEX_URL = "/search/";
+  var LIMIT = 20;
+  // 英数字の並び、またはASCII以外の文字・数字の並び
+  var RUN_RE = /[a-z0-9]+|(?:(?![\x00-\x7f])[\p{L}\p{N}])+/gu;
+  var cache = {};
+
+  function load(name) {
+    if (!cache[name]) {
+      cache[name] = fetch(INDEX_URL + name).then(function (response) {
+        if (!response.ok) throw new Error(name + ": HTTP " + response.status);
+        return response.json();
+      });
+    }
+    return cache[name];
+  }
+
+  function queryTerms(text) {
+    var terms = [];
+    (text.normalize("NFKC").toLowerCase().match(RUN_RE) || []).forEach(function (run) {
+      var chars = Array.from(run);
+      if (/^[\x00-\x7f]+$/.test(run) || chars.length === 1) {
+        terms.push(run);
+      } else {
+        for (var i = 0; i + 1 < chars.length; i++) terms.push(chars[i] + chars[i + 1]);
+      }
+    });
+    return terms.filter(function (term, i) { return terms.indexOf(term) === i; });
+  }
+
+  function shardOf(term, shards) {
+    var h = 0x811c9dc5;
+    for (var ch of term) h = Math.imul(h ^ ch.codePointAt(0), 0x01000193) >>> 0;
+    return h % shards;
+  }
+
+  // 語の出現が入っているファイル（多くの記事に出る語は単独のファイル）
+  function termFile(meta, term) {
+    if (Object.prototype.hasOwnProperty.call(meta.large, term)) return "large-" + meta.large[term] + ".json";
+    return "terms-" + shardOf(term, meta.shards) + ".json";
+  }
+
+  function search(query) {
+    var terms = queryTerms(query);
+    if (!terms.length) return Promise.resolve([]);
+    return load("meta.json").then(function (meta) {
+      var shards = terms.map(function (term) { return load(termFile(meta, term)); });
+      return Promise.all(shards).then(function (postings) {
+        var scores = null;
+        for (var t = 0; t < terms.length; t++) {
+          var large = Object.prototype.hasOwnProperty.call(meta.large, terms[t]);
+          var flat = large ? postings[t] : postings[t][terms[t]];
+          if (!flat) return [];
+          // 多くの記事に出る語ほど重みを下げる
+          var idf = Math.log(1 + meta.docs / (flat.length / 2));
+          var termScores = new Map();
+          for (var i = 0, doc = 0; i < flat.length; i += 2) {
+            doc += flat[i];
+            termScores.set(doc, flat[i + 1] * idf);
+          }
+          if (scores === null) {
+            scores = termScores;
+          } else {
+            var merged = new Map();
+            scores.forEach(function (score, doc) {
+              if (termScores.has(doc)) merged.set(doc, score + termScores.get(doc));
+            });
+            scores = merged;
+          }
+        }
+        var ranked = Array.from(scores).sort(function (a, b) { return b[1] - a[1] || a[0] - b[0]; }).slice(0, LIMIT);
+        return Promise.all(ranked.map(function (entry) {
+          return load("docs-" + Math.floor(entry[0] / meta.docs_per_chunk) + ".json").then(function (docs) {
+            return docs[entry[0] % meta.docs_per_chunk];
+          });
+        }));
+      });
+    });
+  }
+
+  function render(results, query, list, status) {
+    list.textContent = "";
+    status.textContent = query ? (results.length ? results.length + " 件見つかりました" : "見つかりませんでした") : "";
+    results.forEach(function (doc) {
+      var item = document.createElement("li");
+      var link = document.createElement("a");
+      link.href = doc[0];
+      link.textContent = doc[1];
+      item.appendChild(link);
+      if (doc[2]) {
+        var description = document.createElement("p");
+        description.textContent = doc[2];
+        item.appendChild(description);
+      }
+      list.appendChild(item);
+    });
+  }
+
+  document.addEventListener("DOMContentLoaded", function () {
+    var input = document.getElementById("search-input");
+    var list = document.getElementById("search-results");
+    var status = document.getElementById("search-status");
+    if (!input || !list || !status) return;
+    var timer = null;
+    var latest = 0;
+    function run() {
+      var query = input.value.trim();
+      var id = ++latest;
+      history.replaceState(null, "", query ? "?q=" + encodeURIComponent(query) : location.pathname);
+      search(query).then(function (results) {
+        if (id === latest) render(results, query, list, status);
+      }, function (error) {
+        status.textContent = "検索インデックスを読み込めませんでした（" + error.message + "）";
+      });
+    }
+    input.addEventListener("input", function () {
+      clearTimeout(timer);
+      timer = setTimeout(run, 150);
+    });
+    input.form.addEventListener("submit", function (event) {
+      event.preventDefault();
+      run();
+    });
+    input.value = new URLSearchParams(location.search).get("q") || "";
+    if (input.value) run();
+  });
+})();
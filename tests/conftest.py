@@ -0,0 +1,7 @@
+# テストから scripts/ のモジュールを import できるようにする
+
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
@@ -0,0 +1,45 @@
+# ビルドのメモリ使用量のテスト
+# 記事数の違う2つの合成サイトを bench_build.py の子プロセスモードでビルドし（初回＋変更なしの再ビルド）、
+# メインプロセスの最大RSSの増え方が記事1件あたり RSS_SLACK_KB_PER_ARTICLE に収まることを確かめる。
+#
+# 一覧ページ・検索インデックス・サイトマップは全記事のメタデータを使うため、記事ごとの小さな記録
+# （build_manifest.ArticleMeta など）の分だけはRSSが記事数に比例して増える。HTMLや応答全体が溜まると
+# 1件あたり数十KB以上になるので、1件あたりの増加量で上限を決める。
+# 既定では 500 件と 3000 件を比べる（約30秒）。3000 件あれば記事ごとの増加分が測定の揺れ（1MB程度）より
+# 十分大きくなり、1件あたりの増加量は記事数によらずほぼ一定（実測で 500→3000 件は約2.9KB、500→50000 件は約2.7KB）なので、
+# 50000 件の代わりになる。50000 件の初回ビルドは数分かかるため、BUILD_MEMORY_50K=1 を付けたときだけ実行する。
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from bench_build import make_corpus
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+SMALL = 500
+# 記事1件あたりに許すRSSの増加量(KB)。500→3000 件なら約9.8MB、500→50000 件なら約193MBまで
+RSS_SLACK_KB_PER_ARTICLE = 4
+
+
+def peak_rss_mb(root: Path, count: int) -> float:
+    make_corpus(root, count)
+    completed = subprocess.run([sys.executable, str(SCRIPTS_DIR / "bench_build.py"), "--run-in", str(root)],
+                               capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])["peak_rss_mb"]
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="ru_maxrss の単位がKBなのはLinuxだけ")
+@pytest.mark.parametrize("large", [
+    3000,
+    pytest.param(50000, marks=pytest.mark.skipif(not os.environ.get("BUILD_MEMORY_50K"),
+                                                 reason="数分かかるため BUILD_MEMORY_50K=1 のときだけ実行する")),
+])
+def test_peak_rss_growth_is_bounded(tmp_path, large):
+    small_mb = peak_rss_mb(tmp_path / "small", SMALL)
+    large_mb = peak_rss_mb(tmp_path / "large", large)
+    slack_mb = (large - SMALL) * RSS_SLACK_KB_PER_ARTICLE / 1024
+    assert large_mb - small_mb < slack_mb, f"記事 {SMALL} 件で {small_mb} MB、{large} 件で {large_mb} MB（上限 +{slack_mb:.1f} MB）"
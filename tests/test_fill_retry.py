@@ -0,0 +1,144 @@
+# 記事本文の一括生成（--fill）のレート制限とリトライのテスト
+# fake_llm_server の429（--throttle-rpm）・503（--error-rate）・400（--reject-rate）に対して、
+# 一時的な失敗はバックオフして再試行し、送信ペースは --rpm を守り、再試行しない失敗はそのトピックだけを
+# 失敗にすることを確かめる。
+
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+
+import generate_articles
+from fake_llm_server import start_fake_server
+from generate_articles import article_filename, fill_articles
+from generation_journal import JOURNAL_NAME, STATUS_DONE, STATUS_FAILED, GenerationJournal
+from llm_backends import BackendError, GeminiCLIBackend, HTTPBackend
+from rate_limit import RequestScheduler
+
+LANGUAGE = "Python"
+PROMPT_PATH = Path(__file__).resolve().parent.parent / generate_articles.PROMPT_PATH
+
+
+class RecordingScheduler(RequestScheduler):
+    """バックオフの待ち時間を (試行回数, Retry-After, 待ち時間) として記録する"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delays = []
+
+    def backoff_delay(self, attempt: int, retry_after: float = None) -> float:
+        delay = super().backoff_delay(attempt, retry_after)
+        self.delays.append((attempt, retry_after, delay))
+        return delay
+
+
+@pytest.fixture(autouse=True)
+def prompt_path(monkeypatch):
+    monkeypatch.setattr(generate_articles, "PROMPT_PATH", PROMPT_PATH)
+
+
+@pytest.fixture
+def fake_server():
+    server = start_fake_server(seed=0)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_topics(count: int) -> list:
+    return [(i + 1, f"テーマ{i + 1}", "2025-01-01") for i in range(count)]
+
+
+def fill(tmp_path, server, topics, scheduler, concurrency: int = 4):
+    journal = GenerationJournal(tmp_path / "articles" / LANGUAGE.lower() / JOURNAL_NAME)
+    report = asyncio.run(fill_articles(LANGUAGE, topics, HTTPBackend(server.url), concurrency, articles_dir=tmp_path / "articles",
+                                       scheduler=scheduler, journal=journal))
+    return report, journal
+
+
+def test_throttled_and_failed_requests_are_retried_with_backoff(tmp_path, fake_server):
+    # 0.5秒に4件を超えると429（Retry-After付き）、3割の確率で503
+    fake_server.throttle_rpm = 4
+    fake_server.throttle_window = 0.5
+    fake_server.error_rate = 0.3
+    topics = make_topics(12)
+    scheduler = RecordingScheduler(max_retries=20, backoff_base=0.02)
+    report, journal = fill(tmp_path, fake_server, topics, scheduler)
+
+    assert report["failed"] == []
+    assert fake_server.throttled > 0 and fake_server.errors > 0
+    # 429・503のたびに1回ずつ、バックオフしてから再試行している
+    assert report["retries"] == len(scheduler.delays) == fake_server.throttled + fake_server.errors
+    for attempt, retry_after, delay in scheduler.delays:
+        if retry_after is not None:
+            assert delay >= retry_after  # 429は Retry-After 以上待つ
+        else:
+            assert 0 <= delay <= scheduler.backoff_base * 2 ** attempt
+    assert sum(1 for _, retry_after, _ in scheduler.delays if retry_after is not None) == fake_server.throttled
+    for index, theme, _ in topics:
+        assert article_filename(LANGUAGE, theme, index, tmp_path / "articles").exists()
+        assert journal.latest(theme)["status"] == STATUS_DONE
+
+
+def test_requests_stay_within_rpm(tmp_path, fake_server, monkeypatch):
+    accepted = []
+    check_throttle = fake_server.check_throttle
+
+    def record_accepted():
+        retry_after = check_throttle()
+        if retry_after is None:
+            accepted.append(time.monotonic())
+        return retry_after
+
+    monkeypatch.setattr(fake_server, "check_throttle", record_accepted)
+    scheduler = RequestScheduler(requests_per_minute=600)
+    bucket = scheduler.request_bucket
+    topics = make_topics(int(bucket.capacity) + 20)
+    report, _ = fill(tmp_path, fake_server, topics, scheduler, concurrency=8)
+
+    assert report["failed"] == []
+    assert len(accepted) == len(topics)
+    # バケットの容量（最初のバースト）を超えた分は、1分あたり600件（0.1秒に1件）より速く届かない
+    accepted.sort()
+    for n, at in enumerate(accepted, 1):
+        assert at - accepted[0] >= (n - bucket.capacity - 1) / bucket.rate - 0.05
+
+
+def test_non_retryable_error_fails_only_that_topic(tmp_path, fake_server):
+    fake_server.error_rate = 0.2
+    fake_server.reject_rate = 0.3
+    topics = make_topics(10)
+    report, journal = fill(tmp_path, fake_server, topics, RequestScheduler(max_retries=20, backoff_base=0.01))
+
+    failed = dict(report["failed"])
+    assert fake_server.rejected > 0
+    assert len(failed) == fake_server.rejected  # 400 は再試行しない
+    for index, theme, _ in topics:
+        path = article_filename(LANGUAGE, theme, index, tmp_path / "articles")
+        if theme in failed:
+            assert isinstance(failed[theme], BackendError) and failed[theme].status == 400
+            assert not path.exists()
+            assert journal.latest(theme)["status"] == STATUS_FAILED
+        else:
+            assert path.exists()
+            assert journal.latest(theme)["status"] == STATUS_DONE
+
+
+@pytest.mark.parametrize("message, status, retryable", [
+    ("[API Error: got status: 429 Too Many Requests.]", 429, True),
+    ('{"error": {"code": 503, "message": "The model is overloaded."}}', 503, True),
+    ("Error: Quota exceeded for quota metric 'Generate Content API requests per minute'", None, True),
+    ("SyntaxError: Unexpected token at /usr/lib/node_modules/gemini/dist/index.js:503:17", None, False),
+    ("Error: invalid prompt (line 500)", None, False),
+])
+def test_gemini_cli_retryable_errors(tmp_path, message, status, retryable):
+    command = tmp_path / "gemini"
+    command.write_text("#!/bin/sh\nprintf '%s\\n' \"$GEMINI_ERROR\" >&2\nexit 1\n", encoding="utf-8")
+    command.chmod(0o755)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("GEMINI_ERROR", message)
+        with pytest.raises(BackendError) as error:
+            asyncio.run(GeminiCLIBackend(command=str(command)).generate("prompt"))
+    assert error.value.status == status
+    assert error.value.retryable is retryable
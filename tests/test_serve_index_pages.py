@@ -0,0 +1,33 @@
+# 開発サーバーで描画した一覧ページと、その後の build_site.py の差分ビルドの整合性のテスト
+# serve で記事を編集して一覧ページ・フィードを描画し直したあと、記事を元に戻して build_site.py を
+# 実行すると、一覧ページの記録（manifest.index_pages）が古いままだと編集後の内容が残ってしまう。
+
+from pathlib import Path
+
+from bench_build import make_corpus
+from build_site import DOCS_DIR, build
+from serve import SiteWatcher
+
+EDITED_TITLE = "serveで編集したタイトル"
+
+
+def test_build_after_serve_edit_and_revert(tmp_path, monkeypatch):
+    make_corpus(tmp_path, 12)
+    monkeypatch.chdir(tmp_path)
+    mdfile = sorted(Path("articles/go").glob("*.md"))[0]
+    original = mdfile.read_text(encoding="utf-8")
+    title_line = next(line for line in original.splitlines() if line.startswith("title: "))
+    pages = [DOCS_DIR / "index.html", DOCS_DIR / "go" / "index.html", DOCS_DIR / "go" / "feed.xml"]
+
+    site = SiteWatcher()
+    mdfile.write_text(original.replace(title_line, f"title: {EDITED_TITLE}", 1), encoding="utf-8")
+    site.rebuild({mdfile})
+    site.save()
+    for page in pages:
+        assert EDITED_TITLE in page.read_text(encoding="utf-8"), page
+
+    # serve を止めてから記事を元に戻し、差分ビルドする
+    mdfile.write_text(original, encoding="utf-8")
+    build()
+    for page in pages:
+        assert EDITED_TITLE not in page.read_text(encoding="utf-8"), page
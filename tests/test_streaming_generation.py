@@ -0,0 +1,81 @@
+# ストリーミングでの記事本文生成のテスト
+# fake_llm_server に "stream": true で問い合わせ、完了した応答は記事ファイルに原子的に置き換わり、
+# 途中で途切れた・失敗した応答は記事ファイル・応答キャッシュ・ジャーナルの done を残さないことを確かめる。
+
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+import generate_articles
+from fake_llm_server import padded_article_body, start_fake_server
+from generate_articles import article_filename, compose_article, fill_articles, render_prompt
+from generation_journal import JOURNAL_NAME, STATUS_DONE, STATUS_FAILED, GenerationJournal
+from llm_backends import HTTPBackend
+from rate_limit import RequestScheduler
+from response_cache import ResponseCache
+
+LANGUAGE = "Python"
+TOPICS = [(1, "データ型と変数", "2025-01-01"), (2, "条件分岐", "2025-01-02")]
+BODY_KB = 8
+PROMPT_PATH = Path(__file__).resolve().parent.parent / generate_articles.PROMPT_PATH
+
+
+@pytest.fixture
+def fake_server():
+    server = start_fake_server(body_kb=BODY_KB, chunk_chars=64)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def fill(tmp_path, server):
+    """TOPICS をストリーミングで生成し、(結果, 応答キャッシュ, ジャーナル) を返す"""
+    cache = ResponseCache(tmp_path / "cache")
+    journal = GenerationJournal(tmp_path / "articles" / LANGUAGE.lower() / JOURNAL_NAME)
+    report = asyncio.run(fill_articles(LANGUAGE, TOPICS, HTTPBackend(server.url), articles_dir=tmp_path / "articles",
+                                       cache=cache, scheduler=RequestScheduler(max_retries=0), journal=journal, stream=True))
+    return report, cache, journal
+
+
+def leftovers(tmp_path) -> list:
+    """書きかけの一時ファイル（記事・応答キャッシュ）"""
+    return sorted(path.name for path in tmp_path.rglob("*.tmp"))
+
+
+@pytest.fixture(autouse=True)
+def prompt_path(monkeypatch):
+    monkeypatch.setattr(generate_articles, "PROMPT_PATH", PROMPT_PATH)
+
+
+def test_completed_stream_is_renamed_into_articles(tmp_path, fake_server):
+    report, cache, journal = fill(tmp_path, fake_server)
+
+    assert report["failed"] == []
+    template = PROMPT_PATH.read_text(encoding="utf-8")
+    for index, theme, date in TOPICS:
+        path = article_filename(LANGUAGE, theme, index, tmp_path / "articles")
+        response = padded_article_body(render_prompt(template, LANGUAGE, date, theme), BODY_KB)
+        assert path.read_text(encoding="utf-8") == compose_article(LANGUAGE, date, theme, response)
+        assert journal.latest(theme)["status"] == STATUS_DONE
+    assert len(list((tmp_path / "cache" / "blobs").rglob("*.z"))) == len(TOPICS)
+    assert leftovers(tmp_path) == []
+
+
+@pytest.mark.parametrize("failure", ["truncate_rate", "error_rate"])
+def test_interrupted_stream_leaves_nothing(tmp_path, fake_server, failure):
+    # truncate_rate: 本文の途中で [DONE] なしに終わる。error_rate: ストリームを開く前に503を返す
+    setattr(fake_server, failure, 1.0)
+    report, cache, journal = fill(tmp_path, fake_server)
+
+    assert [theme for theme, _ in report["failed"]] == [theme for _, theme, _ in TOPICS]
+    assert list((tmp_path / "articles").rglob("*.md")) == []
+    assert list((tmp_path / "cache").rglob("*.z")) == []
+    assert leftovers(tmp_path) == []
+    for _, theme, _ in TOPICS:
+        assert journal.latest(theme)["status"] == STATUS_FAILED
+    statuses = [json.loads(line)["status"] for line in journal.path.read_text(encoding="utf-8").splitlines()]
+    assert STATUS_DONE not in statuses
+    if failure == "truncate_rate":
+        assert fake_server.truncated == len(TOPICS)